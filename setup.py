@@ -16,14 +16,14 @@ setup(
     author_email="fanfeilong@gmail.com",
     url="https://github.com/fanfeilong/pyeff.git",
     license="MIT",
+    python_requires=">=3.7",
     classifiers=[
         "Topic :: Utilities",
-        "Programming Language :: Python :: 3.5",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
         "Programming Language :: Python :: 3 :: Only",
         "License :: OSI Approved :: MIT License",
     ],
@@ -34,4 +34,7 @@ setup(
         "pyyaml-include>=2.0",
         "aiofiles",
     ],
+    extras_require={
+        "fast": ["orjson"],
+    },
 )
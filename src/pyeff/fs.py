@@ -1,6 +1,12 @@
 import os
+import sys
+import time
+import select
 import shutil
+import struct
 import fnmatch
+import ctypes
+import ctypes.util
 
 
 def ensure(target_dir):
@@ -657,3 +663,190 @@ def listdir(source_dir, extensions=[], sort=True, abs_path=True):
         file_list = sorted(file_list)
 
     return file_list
+
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+)
+_IN_EVENT = struct.Struct("iIII")
+
+_libc = None
+
+
+def _inotify_libc():
+    """
+    Load libc for the inotify calls, only on Linux.
+
+    Returns:
+        ctypes.CDLL: The loaded libc, or None if inotify is not available on this platform.
+    """
+    global _libc
+    if _libc is None and sys.platform.startswith("linux"):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            if hasattr(libc, "inotify_init1"):
+                _libc = libc
+        except OSError:
+            pass
+    return _libc
+
+
+def _stat_signature(path):
+    """
+    Return the (inode, size, mtime) signature of a path, or None if it does not exist.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class FileWatcher(object):
+    """
+    Watch a set of files for modification, creation, deletion and rename.
+
+    On Linux the parent directories of the files are watched with inotify, so `wait` sleeps
+    in the kernel until something happens, and files that are rotated or re-created are still
+    followed by path. On other platforms it falls back to polling `os.stat` every `poll_interval` seconds.
+
+    Example:
+        with FileWatcher(["./app.log"]) as watcher:
+            while True:
+                for path in watcher.wait(timeout=10):
+                    print(f"changed: {path}")
+    """
+
+    def __init__(self, paths, poll_interval=0.5):
+        self.poll_interval = poll_interval
+        self.paths = set()
+        self._fd = None
+        self._dirs = {}
+        self._signatures = {}
+
+        libc = _inotify_libc()
+        if libc is not None:
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd >= 0:
+                self._fd = fd
+
+        for path in paths:
+            self.add(path)
+
+    def add(self, path):
+        """
+        Add a file to the watched set. Its parent directory must exist.
+
+        :param path: The file path to watch.
+        """
+        path = os.path.abspath(path)
+        self.paths.add(path)
+        self._signatures[path] = _stat_signature(path)
+
+        dir_name = os.path.dirname(path)
+        if self._fd is not None and dir_name not in self._dirs.values():
+            wd = _libc.inotify_add_watch(
+                self._fd, os.fsencode(dir_name), _IN_WATCH_MASK
+            )
+            if wd < 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, os.strerror(errno), dir_name)
+            self._dirs[wd] = dir_name
+
+    def fileno(self):
+        """
+        Return the inotify file descriptor, usable with `select` or `loop.add_reader`,
+        or None when the watcher is polling.
+        """
+        return self._fd
+
+    def changes(self):
+        """
+        Collect the watched files changed since the last call, without blocking.
+
+        :return: A set of absolute paths of changed files.
+        """
+        if self._fd is None:
+            changed = set()
+            for path in self.paths:
+                signature = _stat_signature(path)
+                if signature != self._signatures.get(path):
+                    self._signatures[path] = signature
+                    changed.add(path)
+            return changed
+
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, name_len = _IN_EVENT.unpack_from(data, offset)
+                offset += _IN_EVENT.size
+                name = data[offset : offset + name_len].rstrip(b"\0")
+                offset += name_len
+
+                if mask & _IN_Q_OVERFLOW:
+                    changed.update(self.paths)
+                elif wd in self._dirs and name:
+                    path = os.path.join(self._dirs[wd], os.fsdecode(name))
+                    if path in self.paths:
+                        changed.add(path)
+        return changed
+
+    def wait(self, timeout=None):
+        """
+        Block until at least one watched file changes, or the timeout expires.
+
+        :param timeout: The maximum number of seconds to wait, None to wait forever.
+        :return: A set of absolute paths of changed files, empty on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            if self._fd is None:
+                changed = self.changes()
+                if changed or remaining == 0:
+                    return changed
+                time.sleep(
+                    self.poll_interval
+                    if remaining is None
+                    else min(self.poll_interval, remaining)
+                )
+            else:
+                readable, _, _ = select.select([self._fd], [], [], remaining)
+                changed = self.changes()
+                if changed or (not readable and remaining is not None):
+                    return changed
+
+    def close(self):
+        """
+        Release the inotify file descriptor.
+        """
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            self._dirs = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -16,3 +16,26 @@ def hash_string(input_string, algorithm="sha256"):
     hasher = hashlib.new(algorithm)
     hasher.update(input_string.encode("utf-8"))
     return hasher.hexdigest()
+
+
+def hash_file(file_name, algorithm="sha256", chunk_size=1 << 20):
+    """
+    Generate a hash of a file content, reading it in chunks so that large files use constant memory.
+
+    Args:
+        file_name (str): The path to the file to be hashed.
+        algorithm (str): The hashing algorithm to use (e.g., 'sha256', 'md5').
+                          Defaults to 'sha256'.
+        chunk_size (int): The number of bytes read at once. Defaults to 1 MiB.
+
+    Returns:
+        str: The hexadecimal digest of the file content.
+    """
+    hasher = hashlib.new(algorithm)
+    with open(file_name, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
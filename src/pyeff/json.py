@@ -1,13 +1,178 @@
 import os
+import re
+import math
 import json
+import itertools
+import functools
 
+from .lines import map_chunks, dump_lines
 
-def load_json(json_file):
+# optional faster backends, the stdlib json module is the fallback
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+_JSON_BACKENDS = {"orjson": orjson, "ujson": ujson, "json": json}
+_json_backend = "orjson" if orjson is not None else "ujson" if ujson is not None else "json"
+
+
+def json_backend():
+    """
+    Return the name of the JSON backend in use: "orjson", "ujson" or "json".
+    """
+    return _json_backend
+
+
+def set_json_backend(backend=None):
+    """
+    Force the JSON backend used by this module.
+
+    Args:
+        backend (str, optional): "orjson", "ujson" or "json". Defaults to None, the fastest installed one.
+
+    Returns:
+        str: The backend now in use.
+
+    Raises:
+        ValueError: If the backend is unknown or not installed.
+    """
+    global _json_backend
+    if backend is None:
+        backend = "orjson" if orjson is not None else "ujson" if ujson is not None else "json"
+    if _JSON_BACKENDS.get(backend) is None:
+        raise ValueError(f"json backend '{backend}' is unknown or not installed")
+    _json_backend = backend
+    return _json_backend
+
+
+# every char mapped to a space but digits, mapped to "0", to find long digit runs at C speed
+_DIGITS_ONLY = bytes(0x30 if 0x30 <= c <= 0x39 else 0x20 for c in range(256))
+_LONG_DIGITS = re.compile(r"[0-9]{19}")
+
+
+def _has_long_digits(data):
+    """
+    Whether `data` holds a run of 19 digits or more, like an integer beyond the 64-bit range.
+    """
+    if isinstance(data, str):
+        return _LONG_DIGITS.search(data) is not None
+    return b"0" * 19 in data.translate(_DIGITS_ONLY)
+
+
+def _loads(data, backend=None):
+    """
+    Decode a JSON document from str or UTF-8 bytes with the backend.
+
+    The documents orjson rejects but the stdlib accepts, like NaN, are decoded by the stdlib. So are the
+    ones with 19 digits or more in a row: orjson decodes the integers beyond 64 bits as floats, losing them.
+    """
+    backend = backend or _json_backend
+    if backend != "json" and _has_long_digits(data):
+        backend = "json"
+    if backend == "orjson":
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    elif backend == "ujson":
+        try:
+            return ujson.loads(data)
+        except ValueError:
+            pass
+    return json.loads(data)
+
+
+def _same_as_stdlib(obj):
+    """
+    Whether orjson or ujson encode `obj` byte for byte like the stdlib does.
+
+    Only exact dict, list, tuple, str, int, bool and None values qualify, with str or int keys, and
+    floats that the stdlib writes without an exponent. Anything else, like NaN, infinities, datetimes,
+    UUIDs, enums or subclasses, which the fast backends write differently or accept where the stdlib
+    raises, and too deep or circular containers, must go through the stdlib.
+    """
+    isfinite = math.isfinite
+    stack = [(obj, 0)]
+    while stack:
+        value, depth = stack.pop()
+        t = type(value)
+        if t is str or t is int or t is bool or value is None:
+            continue
+        if t is float:
+            if not (value == 0 or (isfinite(value) and 1e-4 <= abs(value) < 1e16)):
+                return False
+        elif t is dict:
+            if depth >= 250:
+                return False
+            for key, item in value.items():
+                if type(key) is not str and type(key) is not int:
+                    return False
+                stack.append((item, depth + 1))
+        elif t is list or t is tuple:
+            if depth >= 250:
+                return False
+            stack.extend((item, depth + 1) for item in value)
+        else:
+            return False
+    return True
+
+
+def _reject(obj):
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps(obj, backend=None, indent=None):
+    """
+    Encode an object to UTF-8 JSON bytes with the backend, non-ASCII chars written as is.
+
+    `indent` is None for the compact form, or 2. The output is the one of the stdlib whatever the backend:
+    the objects the fast backends would write differently (see `_same_as_stdlib`), or can not encode like
+    big integers, are encoded by the stdlib, which also raises the same errors.
+    """
+    backend = backend or _json_backend
+    if backend != "json" and _same_as_stdlib(obj):
+        if backend == "orjson":
+            option = (
+                orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_PASSTHROUGH_DATACLASS
+                | orjson.OPT_PASSTHROUGH_SUBCLASS
+            )
+            if indent is not None:
+                assert indent == 2
+                option |= orjson.OPT_INDENT_2
+            try:
+                return orjson.dumps(obj, default=_reject, option=option)
+            except (orjson.JSONEncodeError, TypeError):
+                pass
+        elif backend == "ujson":
+            try:
+                return ujson.dumps(
+                    obj, indent=indent or 0, ensure_ascii=False, escape_forward_slashes=False
+                ).encode("utf-8")
+            except (TypeError, OverflowError, ValueError):
+                pass
+    if indent is None:
+        text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    else:
+        text = json.dumps(obj, indent=indent, ensure_ascii=False)
+    return text.encode("utf-8")
+
+
+def load_json(json_file, backend=None):
     """
     Loads a JSON file and returns its content as a Python object.
     
     Args:
-        json_file (str): The path to the JSON file to be loaded.
+        json_file (str): The path to the JSON file to be loaded, UTF-8 encoded.
+        backend (str, optional): Force "orjson", "ujson" or "json" for this call. Defaults to `json_backend()`.
         
     Returns:
         object: The Python representation of the JSON data.
@@ -16,18 +181,305 @@ def load_json(json_file):
         AssertionError: If the specified file does not exist.
     """
     assert os.path.exists(json_file)
-    with open(json_file, "r", encoding="utf-8") as f:
-        return json.load(f)
+    with open(json_file, "rb") as f:
+        return _loads(f.read(), backend)
 
 
-def dump_json(obj, json_file):
+def dump_json(obj, json_file, backend=None):
     """
     Dumps a Python object into a JSON file with indentation and UTF-8 encoding.
+
+    The document is encoded by the backend of `json_backend()`, orjson or ujson when installed,
+    always with an indent of 2 and non-ASCII chars written as is. The file content is the one the stdlib
+    writes: values a fast backend would write differently, like NaN, are encoded by the stdlib.
     
     Args:
         obj: The Python object to be converted into JSON format.
         json_file: The file path where the JSON data will be saved. 
                    The file will be created if it doesn't exist, and overwritten if it does.
+        backend (str, optional): Force "orjson", "ujson" or "json" for this call. Defaults to `json_backend()`.
+    """
+    data = _dumps(obj, backend, indent=2)
+    with open(json_file, "wb") as f:
+        f.write(data)
+
+
+_JSON_WHITESPACE = " \t\n\r"
+# "" too, the end of the buffer
+_JSON_NUMBER_CHARS = "0123456789.eE+-"
+# the next char changing the nesting, outside and inside of strings
+_JSON_STRUCTURE = re.compile(r'[{}\[\]"]')
+_JSON_STRING_END = re.compile(r'["\\]')
+
+
+class _JsonStream(object):
+    """
+    A cursor over a JSON text read in chunks, only the unconsumed part of it is kept in memory.
+    """
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self, size=None):
+        """
+        Read more text, dropping the consumed part of the buffer. Returns False at the end of the file.
+        """
+        if self.eof:
+            return False
+        data = self.f.read(size or self.chunk_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos :] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Skip whitespace and return the next char, "" at the end of the file.
+        """
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _JSON_WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf) or not self.fill():
+                return self.buf[self.pos : self.pos + 1]
+
+    def expect(self, chars):
+        c = self.peek()
+        if c == "" or c not in chars:
+            raise ValueError(f"expecting one of '{chars}' at char {self.pos}, got '{c}'")
+        self.pos += 1
+        return c
+
+    def decode(self):
+        """
+        Decode the next value, reading as much as it needs.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # a number may go on in the next chunk, like "1" of "1.5" or "1e" of "1e5"
+                truncated = (
+                    (type(value) is int or type(value) is float)
+                    and self.buf[end : end + 1] in _JSON_NUMBER_CHARS
+                )
+                if not truncated or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # read at least as much again, so that a large value is decoded a few times only
+            self.fill(max(self.chunk_size, len(self.buf) - self.pos))
+
+    def skip(self):
+        """
+        Skip the next value without building it.
+        """
+        if self.peek() not in "{[":
+            self.decode()
+            return
+
+        depth = 0
+        while True:
+            m = _JSON_STRUCTURE.search(self.buf, self.pos)
+            if m is None:
+                self.pos = len(self.buf)
+                if not self.fill():
+                    raise ValueError("unexpected end of the JSON text")
+                continue
+
+            self.pos = m.end()
+            c = m.group()
+            if c == '"':
+                self._skip_string()
+            elif c in "{[":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def _skip_string(self):
+        while True:
+            m = _JSON_STRING_END.search(self.buf, self.pos)
+            if m is None or m.end() == len(self.buf):
+                self.pos = m.start() if m is not None else len(self.buf)
+                if not self.fill():
+                    raise ValueError("unterminated string in the JSON text")
+                continue
+            if m.group() == '"':
+                self.pos = m.end()
+                return
+            # an escape, skip the escaped char
+            self.pos = m.end() + 1
+
+
+def iter_json_array(json_file, prefix=None, chunk_size=1 << 20):
+    """
+    Iterates the elements of a JSON array, reading the file in chunks.
+
+    The file is never loaded as a whole: the values before the array are skipped without being built,
+    and each element is decoded by `json.JSONDecoder.raw_decode` when it is reached, so the memory used
+    is bounded by the largest single element.
+
+    Args:
+        json_file (str): The path to the JSON file.
+        prefix (str or list, optional): The path to a nested array, as dot separated object keys like
+            "data.items", or a list of object keys and array indexes like ["data", 0, "items"].
+            Defaults to None, the top-level array.
+        chunk_size (int, optional): The number of chars read at once. Defaults to 1M.
+
+    Yields:
+        object: The elements of the array, in order.
+
+    Raises:
+        AssertionError: If the specified file does not exist.
+        KeyError: If a key or an index of `prefix` is not found.
+        ValueError: If the JSON text is malformed, or the value at `prefix` is not an array.
+    """
+    assert os.path.exists(json_file)
+
+    if prefix is None:
+        prefix = []
+    elif isinstance(prefix, str):
+        prefix = prefix.split(".") if prefix else []
+
+    with open(json_file, "r", encoding="utf-8") as f:
+        stream = _JsonStream(f, chunk_size)
+
+        for step in prefix:
+            if isinstance(step, int):
+                stream.expect("[")
+                if stream.peek() == "]":
+                    raise KeyError(step)
+                for _ in range(step):
+                    stream.skip()
+                    if stream.expect(",]") == "]":
+                        raise KeyError(step)
+                continue
+
+            stream.expect("{")
+            if stream.peek() == "}":
+                raise KeyError(step)
+            while True:
+                if stream.peek() != '"':
+                    raise ValueError(f"expecting a key at char {stream.pos}")
+                key = stream.decode()
+                stream.expect(":")
+                if key == step:
+                    break
+                stream.skip()
+                if stream.expect(",}") == "}":
+                    raise KeyError(step)
+
+        if stream.peek() != "[":
+            raise ValueError(f"expecting an array at {'.'.join(map(str, prefix)) or 'the top level'}")
+        stream.expect("[")
+        if stream.peek() == "]":
+            return
+        while True:
+            yield stream.decode()
+            if stream.expect(",]") == "]":
+                return
+
+
+def iter_jsonl(jsonl_file, backend=None):
+    """
+    Iterates the records of a JSON Lines file, decoding one line at a time. Blank lines are skipped.
+
+    Args:
+        jsonl_file (str): The path to the JSONL file.
+        backend (str, optional): Force "orjson", "ujson" or "json" for this call. Defaults to `json_backend()`.
+
+    Yields:
+        object: The records, in order.
+
+    Raises:
+        AssertionError: If the specified file does not exist.
+        ValueError: If a line is not valid JSON, the message holds its line number.
     """
-    with open(json_file, "w", encoding="utf-8") as f:
-        json.dump(obj, f, indent=2, ensure_ascii=False)
+    assert os.path.exists(jsonl_file)
+    with open(jsonl_file, "r", encoding="utf-8", buffering=1 << 20) as f:
+        for index, line in enumerate(f):
+            if not line.strip():
+                continue
+            try:
+                yield _loads(line, backend)
+            except ValueError as e:
+                raise ValueError(f"{jsonl_file}:{index + 1}: {e}") from e
+
+
+def _decode_jsonl_chunk(backend, data):
+    """
+    Worker side of `load_jsonl`: decode the records of a newline-aligned chunk.
+    """
+    return [_loads(line, backend) for line in data.split(b"\n") if line.strip()]
+
+
+def load_jsonl(jsonl_file, parallel=False, workers=None, chunk_size=64 << 20, backend=None):
+    """
+    Loads all the records of a JSON Lines file into a list.
+
+    With `parallel`, the file is split on newline boundaries by `pyeff.lines.map_chunks` and the chunks are
+    decoded in a process pool, which scales with the CPUs on large files, the records being pickled back.
+
+    Args:
+        jsonl_file (str): The path to the JSONL file.
+        parallel (bool, optional): If True, decode chunks in a process pool. Defaults to False.
+        workers (int, optional): The number of worker processes. Defaults to `os.cpu_count()`.
+        chunk_size (int, optional): The target size in bytes of one chunk. Defaults to 64 MiB.
+        backend (str, optional): Force "orjson", "ujson" or "json" for this call. Defaults to `json_backend()`.
+
+    Returns:
+        list: The records, in file order.
+
+    Raises:
+        AssertionError: If the specified file does not exist.
+    """
+    assert os.path.exists(jsonl_file)
+    if not parallel:
+        return list(iter_jsonl(jsonl_file, backend))
+
+    # the backend is passed explicitly, the workers may not share the forced one
+    chunks = map_chunks(
+        jsonl_file,
+        functools.partial(_decode_jsonl_chunk, backend or _json_backend),
+        workers=workers,
+        chunk_size=chunk_size,
+    )
+    return list(itertools.chain.from_iterable(chunks))
+
+
+def dump_jsonl(records, jsonl_file, atomic=False, backend=None):
+    """
+    Dumps records, from a list or a generator, into a JSON Lines file, one compact UTF-8 JSON document per line.
+
+    Records are encoded as they are consumed and written in large batches by `pyeff.lines.dump_lines`.
+
+    Args:
+        records (iterable): The Python objects to be written, one per line.
+        jsonl_file (str): The file path where the records will be saved.
+        atomic (bool, optional): If True, write to a temporary file and atomically rename it over the target. Defaults to False.
+        backend (str, optional): Force "orjson", "ujson" or "json" for this call. Defaults to `json_backend()`.
+
+    Returns:
+        int: The number of records written.
+    """
+    count = 0
+
+    def encoded():
+        nonlocal count
+        for record in records:
+            count += 1
+            yield _dumps(record, backend).decode("utf-8") + "\n"
+
+    dump_lines(encoded(), jsonl_file, encoding="utf-8", atomic=atomic)
+
+    return count
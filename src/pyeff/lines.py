@@ -1,45 +1,190 @@
 import os
 import re
+import time
+import asyncio
+import bisect
+import collections
+import operator
+import functools
+import mmap
+import contextlib
+import itertools
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from .fs import FileWatcher
+
+
+def _read_proc_umask():
+    """
+    Read the umask from /proc/self/status (Linux 4.7+), without changing it. None if not available.
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _import_umask():
+    umask = _read_proc_umask()
+    if umask is None:
+        # os.umask can only be read by setting it, done once at import rather than around every write,
+        # as the umask is process-wide and other threads may be creating files meanwhile
+        umask = os.umask(0o022)
+        os.umask(umask)
+    return umask
+
+
+_UMASK = _import_umask()
+
+
+def _current_umask():
+    """
+    The process umask: read from /proc when possible, else the one at import time.
+    """
+    umask = _read_proc_umask()
+    return _UMASK if umask is None else umask
+
+
+def _mkstemp_beside(file_name):
+    """
+    Create a temporary file in the same directory as `file_name`, so that it can
+    later be renamed over `file_name` atomically.
+
+    Args:
+        file_name (str): The file the temporary file will eventually replace.
 
+    Returns:
+        tuple: A tuple (fd, tmp_name) with the open file descriptor and the temporary file path.
+    """
+    dir_name = os.path.dirname(os.path.abspath(file_name))
+    base_name = os.path.basename(file_name)
+    return tempfile.mkstemp(prefix=f".{base_name}.", suffix=".tmp", dir=dir_name)
+
+
+def _commit_temp(tmp_name, file_name):
+    """
+    Atomically replace `file_name` with `tmp_name`, keeping the permission bits of the original file,
+    or the umask default for a new file.
 
-def load_all_text(file_name):
+    Args:
+        tmp_name (str): The fully written temporary file.
+        file_name (str): The target file to be replaced.
+    """
+    if os.path.exists(file_name):
+        shutil.copymode(file_name, tmp_name)
+    else:
+        os.chmod(tmp_name, 0o666 & ~_current_umask())
+    os.replace(tmp_name, file_name)
+
+
+@contextlib.contextmanager
+def _open_write(file_name, mode="w", atomic=False, **kwargs):
+    """
+    Open a file for writing, optionally through a temporary file that is atomically
+    renamed over `file_name` once everything has been written successfully.
+
+    Args:
+        file_name (str): The path to the file to be written.
+        mode (str, optional): The open mode, "w" or "wb". Defaults to "w".
+        atomic (bool, optional): Whether to replace the file atomically. Defaults to False.
+        **kwargs: Extra arguments passed to `open`, like encoding, errors or buffering.
+
+    Yields:
+        file: The opened file object.
+    """
+    if not atomic:
+        with open(file_name, mode, **kwargs) as f:
+            yield f
+        return
+
+    fd, tmp_name = _mkstemp_beside(file_name)
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+        _commit_temp(tmp_name, file_name)
+    finally:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+
+
+def load_all_text(file_name, encoding=None, errors=None):
     """
     Load and return the entire content of a text file.
 
     Args:
         file_name (str): The path to the text file to be read.
+        encoding (str, optional): The text encoding. Defaults to None, the platform default.
+        errors (str, optional): The decoding error handler, like "strict" or "replace". Defaults to None.
 
     Returns:
         str: The contents of the file as a single string.
     """
-    with open(file_name, "r") as f:
+    with open(file_name, "r", encoding=encoding, errors=errors) as f:
         return f.read()
 
 
-def dump_all_text(content, file_name):
+def dump_all_text(content, file_name, encoding=None, errors=None, atomic=False):
     """
     Write the entire content to a specified file.
 
     Args:
         content (str): The text content to be written to the file.
         file_name (str): The name of the file to which the content will be written.
+        encoding (str, optional): The text encoding. Defaults to None, the platform default.
+        errors (str, optional): The encoding error handler. Defaults to None.
+        atomic (bool, optional): If True, write to a temporary file and atomically rename it over the target. Defaults to False.
     """
-    with open(file_name, "w") as f:
+    with _open_write(file_name, "w", atomic=atomic, encoding=encoding, errors=errors) as f:
         f.write(content)
 
 
-def load_lines(file_name, remove_new_line=False):
+def load_all_bytes(file_name):
+    """
+    Load and return the entire content of a file as raw bytes, without any decoding.
+
+    Args:
+        file_name (str): The path to the file to be read.
+
+    Returns:
+        bytes: The contents of the file.
+    """
+    with open(file_name, "rb") as f:
+        return f.read()
+
+
+def dump_all_bytes(content, file_name, atomic=False):
+    """
+    Write raw bytes to a specified file, without any encoding.
+
+    Args:
+        content (bytes): The bytes to be written to the file.
+        file_name (str): The name of the file to which the content will be written.
+        atomic (bool, optional): If True, write to a temporary file and atomically rename it over the target. Defaults to False.
+    """
+    with _open_write(file_name, "wb", atomic=atomic) as f:
+        f.write(content)
+
+
+def load_lines(file_name, remove_new_line=False, encoding=None, errors=None):
     """
     This function reads a text file and loads its content into a list of lines.
 
     Args:
         file_name (str): The name or path of the file to be read.
         remove_new_line (bool, optional): A flag indicating whether to remove newline characters from the end of each line. Defaults to False.
+        encoding (str, optional): The text encoding. Defaults to None, the platform default.
+        errors (str, optional): The decoding error handler, like "strict" or "replace". Defaults to None.
 
     Returns:
         list[str]: A list containing the lines of the file. If remove_new_line is True, newline characters are stripped from each line's end.
     """
-    with open(file_name, "r") as f:
+    with open(file_name, "r", encoding=encoding, errors=errors) as f:
         lines = f.readlines()
 
     if remove_new_line:
@@ -48,21 +193,51 @@ def load_lines(file_name, remove_new_line=False):
     return lines
 
 
-def dump_lines(lines, file_name, append_new_lines=False):
+def dump_lines(
+    lines,
+    file_name,
+    append_new_lines=False,
+    encoding=None,
+    errors=None,
+    atomic=False,
+    batch_size=8192,
+    buffer_size=1 << 20,
+):
     """
-    Write a list of strings to a file, with an option to append newlines.
+    Write a list, or any iterable such as a generator, of strings to a file, with an option to append newlines.
+
+    Lines are consumed in batches, each batch is joined into one string and written with a single
+    call through a large write buffer, so that generated lines are written at disk speed instead of
+    paying Python overhead per line.
 
     Args:
-        lines (list of str): The list of strings to be written to the file.
+        lines (iterable of str): The strings to be written to the file.
         file_name (str): The name of the file to write to.
         append_new_lines (bool, optional): If True, appends a newline character to each string in the list. Defaults to False.
-
+        encoding (str, optional): The text encoding. Defaults to None, the platform default.
+        errors (str, optional): The encoding error handler. Defaults to None.
+        atomic (bool, optional): If True, write to a temporary file and atomically rename it over the target. Defaults to False.
+        batch_size (int, optional): The number of lines joined per write. Defaults to 8192.
+        buffer_size (int, optional): The size in bytes of the write buffer. Defaults to 1 MiB.
     """
-    if append_new_lines:
-        lines = [l + "\n" for l in lines]
-
-    with open(file_name, "w") as f:
-        f.writelines(lines)
+    it = iter(lines)
+    with _open_write(
+        file_name,
+        "w",
+        atomic=atomic,
+        encoding=encoding,
+        errors=errors,
+        buffering=buffer_size,
+    ) as f:
+        while True:
+            batch = list(itertools.islice(it, batch_size))
+            if not batch:
+                break
+            if append_new_lines:
+                batch.append("")
+                f.write("\n".join(batch))
+            else:
+                f.write("".join(batch))
 
 
 def split(lines, *patterns):
@@ -309,6 +484,170 @@ def insert(
     return new_lines if has_changed else source_lines
 
 
+class EditSession(object):
+    """
+    Collects many line edits for one file and applies them in a single streaming pass.
+
+    Edits are keyed either by a regex `pattern` (matched with `re.search`, like `insert`)
+    or by a 0-based line `index`. The source file is read line by line, the result is
+    written to a temporary file beside it, which is then atomically renamed over the source.
+
+    Example:
+        session = EditSession("./setup.py")
+        session.insert(["# begin"], index=0, append_new_line=True)
+        session.replace(['    version="0.2.0",'], pattern="version=", append_new_line=True)
+        session.delete(pattern=r"^# TODO")
+        session.apply()
+
+    When several edits hit the same line, inserted lines are kept in the order the edits
+    were added, and the first replace or delete wins for the line itself.
+    """
+
+    def __init__(self, file_name, encoding=None, errors=None):
+        self.file_name = file_name
+        self.encoding = encoding
+        self.errors = errors
+        self.edits = []
+
+    def _add(self, kind, lines, pattern, index, append_new_line, insert_before):
+        assert (pattern is None) != (index is None), "use exactly one of pattern or index"
+
+        if append_new_line:
+            lines = [l + "\n" for l in lines]
+
+        if isinstance(pattern, str):
+            pattern = re.compile(pattern)
+
+        self.edits.append(
+            {
+                "kind": kind,
+                "lines": list(lines),
+                "pattern": pattern,
+                "index": index,
+                "insert_before": insert_before,
+                "seq": len(self.edits),
+            }
+        )
+        return self
+
+    def insert(
+        self,
+        insert_lines,
+        pattern=None,
+        index=None,
+        append_new_line=False,
+        insert_before=False,
+    ):
+        """
+        Insert lines after (or before) every line matching `pattern`, or the line at `index`.
+
+        :param insert_lines: Lines to insert.
+        :param pattern: Regex pattern, str or compiled, searched in every line.
+        :param index: 0-based index of the target line.
+        :param append_new_line: Boolean indicating whether to append a newline to each inserted line.
+        :param insert_before: Boolean to control insertion position (before or after the target line).
+        :return: The session itself, so that calls can be chained.
+        """
+        return self._add(
+            "insert", insert_lines, pattern, index, append_new_line, insert_before
+        )
+
+    def replace(self, replace_lines, pattern=None, index=None, append_new_line=False):
+        """
+        Replace every line matching `pattern`, or the line at `index`, with `replace_lines`.
+
+        :param replace_lines: Lines to write instead of the target line.
+        :param pattern: Regex pattern, str or compiled, searched in every line.
+        :param index: 0-based index of the target line.
+        :param append_new_line: Boolean indicating whether to append a newline to each replacement line.
+        :return: The session itself, so that calls can be chained.
+        """
+        return self._add("replace", replace_lines, pattern, index, append_new_line, False)
+
+    def delete(self, pattern=None, index=None):
+        """
+        Delete every line matching `pattern`, or the line at `index`.
+
+        :param pattern: Regex pattern, str or compiled, searched in every line.
+        :param index: 0-based index of the target line.
+        :return: The session itself, so that calls can be chained.
+        """
+        return self._add("replace", [], pattern, index, False, False)
+
+    def apply(self):
+        """
+        Apply all collected edits in one pass and atomically replace the file.
+
+        The file is left untouched when no edit matched any line.
+
+        Returns:
+            bool: True if the file was changed, False otherwise.
+        """
+        pattern_edits = [e for e in self.edits if e["pattern"] is not None]
+        index_edits = {}
+        for e in self.edits:
+            if e["index"] is not None:
+                index_edits.setdefault(e["index"], []).append(e)
+
+        has_changed = False
+        fd, tmp_name = _mkstemp_beside(self.file_name)
+        try:
+            with open(
+                self.file_name, "r", encoding=self.encoding, errors=self.errors
+            ) as src, os.fdopen(
+                fd, "w", encoding=self.encoding, errors=self.errors
+            ) as dst:
+                out = []
+                for i, line in enumerate(src):
+                    matched = [e for e in pattern_edits if e["pattern"].search(line)]
+                    if i in index_edits:
+                        matched = sorted(matched + index_edits[i], key=lambda e: e["seq"])
+
+                    if not matched:
+                        out.append(line)
+                    else:
+                        has_changed = True
+                        before, body, after = [], [line], []
+                        replaced = False
+                        for e in matched:
+                            if e["kind"] == "insert":
+                                (before if e["insert_before"] else after).extend(e["lines"])
+                            elif not replaced:
+                                body = e["lines"]
+                                replaced = True
+                        out.extend(before)
+                        out.extend(body)
+                        out.extend(after)
+
+                    if len(out) >= 8192:
+                        dst.writelines(out)
+                        out = []
+                dst.writelines(out)
+
+            if has_changed:
+                _commit_temp(tmp_name, self.file_name)
+        finally:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+
+        return has_changed
+
+
+def edit_files(sessions, max_workers=None):
+    """
+    Apply many edit sessions, one per file, in parallel.
+
+    Args:
+        sessions (list of EditSession): The sessions to apply. Each session should target a different file.
+        max_workers (int, optional): The maximum number of worker threads. Defaults to the executor default.
+
+    Returns:
+        list of bool: For each session, whether its file was changed.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda s: s.apply(), sessions))
+
+
 def find(lines, *patterns):
     """
     Search for any of the given patterns in the provided lines of text.
@@ -332,6 +671,661 @@ def find(lines, *patterns):
     return False
 
 
+def _compile_bytes_patterns(patterns):
+    """
+    Compile str, bytes or compiled bytes patterns into one bytes regex in MULTILINE mode,
+    so that `^` and `$` anchor at line boundaries inside a whole-file buffer.
+
+    Args:
+        patterns (tuple): str, bytes or compiled bytes regex patterns.
+
+    Returns:
+        re.Pattern: A single compiled bytes regex matching any of the patterns.
+    """
+    assert len(patterns) > 0
+
+    compiled = []
+    for pattern in patterns:
+        if isinstance(pattern, str):
+            pattern = pattern.encode("utf-8")
+        if isinstance(pattern, bytes):
+            pattern = re.compile(pattern, re.MULTILINE)
+        compiled.append(pattern)
+
+    if len(compiled) == 1:
+        return compiled[0]
+
+    flags = re.MULTILINE
+    for pattern in compiled:
+        flags |= pattern.flags
+    return re.compile(b"|".join(b"(?:" + p.pattern + b")" for p in compiled), flags)
+
+
+@contextlib.contextmanager
+def _mmap_file(file_name):
+    """
+    Memory-map a file read-only. Empty files, which can not be mapped, yield an empty bytes object.
+
+    Args:
+        file_name (str): The path to the file to be mapped.
+
+    Yields:
+        mmap.mmap or bytes: A buffer with the file content.
+    """
+    with open(file_name, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            yield buf
+
+
+def _count_new_lines(buf, start, end, step=1 << 24):
+    """
+    Count b"\\n" in buf[start:end], copying at most `step` bytes at a time.
+    """
+    count = 0
+    while start < end:
+        stop = min(start + step, end)
+        count += buf[start:stop].count(b"\n")
+        start = stop
+    return count
+
+
+def find_in_file(file_name, *patterns):
+    """
+    Check whether any of the given patterns occurs in a file, without decoding it.
+
+    The file is memory-mapped and the patterns are run as bytes regexes over the whole buffer,
+    so no str is allocated at all. Patterns use `re.search` semantics in MULTILINE mode,
+    use `^` to anchor at a line start like `find` does.
+
+    Parameters:
+    - file_name (str): The path to the file to search.
+    - patterns (str, bytes or compiled bytes regex): Variable number of patterns to search for.
+
+    Returns:
+    - bool: True if any pattern matches, False otherwise.
+    """
+    regex = _compile_bytes_patterns(patterns)
+    with _mmap_file(file_name) as buf:
+        return regex.search(buf) is not None
+
+
+def grep_file(file_name, *patterns, encoding="utf-8", errors="replace", remove_new_line=False):
+    """
+    Yield the lines of a file matching any of the given patterns, decoding only those lines.
+
+    The file is memory-mapped and searched with bytes regexes. Line indexes are computed lazily,
+    by counting newlines between consecutive matches, and every line is yielded at most once.
+
+    Parameters:
+    - file_name (str): The path to the file to search.
+    - patterns (str, bytes or compiled bytes regex): Variable number of patterns to search for.
+    - encoding (str, optional): The encoding used to decode matching lines. Defaults to "utf-8".
+    - errors (str, optional): The error handler used to decode matching lines. Defaults to "replace".
+    - remove_new_line (bool, optional): Whether to strip the trailing newline of each line. Defaults to False.
+
+    Yields:
+    - tuple: A tuple (index, line) with the 0-based line index and the decoded line.
+    """
+    regex = _compile_bytes_patterns(patterns)
+    with _mmap_file(file_name) as buf:
+        size = len(buf)
+        index = 0
+        counted = 0
+        pos = 0
+        while pos < size:
+            m = regex.search(buf, pos)
+            if m is None:
+                break
+
+            line_start = buf.rfind(b"\n", 0, m.start()) + 1
+            line_end = buf.find(b"\n", m.start())
+            line_end = size if line_end < 0 else line_end + 1
+
+            index += _count_new_lines(buf, counted, line_start)
+            counted = line_start
+
+            line = buf[line_start:line_end].decode(encoding, errors)
+            if remove_new_line:
+                line = line.strip("\n")
+            yield index, line
+
+            pos = line_end
+
+
+def _tail_offset(f, n, block_size=1 << 16):
+    """
+    Find the offset of the start of the last `n` lines of a binary file, reading backwards in blocks.
+
+    Args:
+        f (file): A file opened in binary mode.
+        n (int): The number of lines to keep, 0 means the end of the file.
+        block_size (int, optional): The size of each backward read. Defaults to 64 KiB.
+
+    Returns:
+        int: The offset to seek to.
+    """
+    end = f.seek(0, os.SEEK_END)
+    if n <= 0:
+        return end
+
+    count = 0
+    pos = end
+    while pos > 0:
+        size = min(block_size, pos)
+        pos -= size
+        f.seek(pos)
+        block = f.read(size)
+        idx = len(block)
+        while True:
+            idx = block.rfind(b"\n", 0, idx)
+            if idx < 0:
+                break
+            if pos + idx == end - 1:
+                # the newline ending the last line
+                continue
+            count += 1
+            if count == n:
+                return pos + idx + 1
+    return 0
+
+
+class _Follower(object):
+    """
+    Incremental reader behind `follow` and `afollow`, it keeps the open file, the inode
+    being followed and the trailing partial line between reads.
+    """
+
+    def __init__(self, file_name, lines, remove_new_line, encoding, errors, batch_bytes):
+        self.file_name = file_name
+        self.remove_new_line = remove_new_line
+        self.encoding = encoding
+        self.errors = errors
+        self.batch_bytes = batch_bytes
+        self.pending = b""
+        self.f = None
+        self.ino = None
+        self._open(lines)
+
+    def _open(self, lines=None):
+        try:
+            self.f = open(self.file_name, "rb")
+        except FileNotFoundError:
+            self.f = None
+            return
+        self.ino = os.fstat(self.f.fileno()).st_ino
+        if lines is not None:
+            self.f.seek(_tail_offset(self.f, lines))
+
+    def _split(self, data, flush=False):
+        data = self.pending + data
+        end = len(data) if flush else data.rfind(b"\n") + 1
+        self.pending = data[end:]
+        if end == 0:
+            return []
+
+        parts = data[:end].decode(self.encoding, self.errors).split("\n")
+        if parts[-1] == "":
+            parts.pop()
+            tail = []
+        else:
+            tail = [parts.pop()]
+        if not self.remove_new_line:
+            parts = [p + "\n" for p in parts]
+        return parts + tail
+
+    def read(self):
+        """
+        Read what is available, following truncation and rotation.
+
+        :return: A list of complete lines, possibly empty.
+        """
+        if self.f is None:
+            self._open()
+            if self.f is None:
+                return []
+
+        if os.fstat(self.f.fileno()).st_size < self.f.tell():
+            # truncated in place, start over
+            self.f.seek(0)
+            self.pending = b""
+
+        lines = self._split(self.f.read(self.batch_bytes))
+        if lines:
+            return lines
+
+        try:
+            rotated = os.stat(self.file_name).st_ino != self.ino
+        except FileNotFoundError:
+            rotated = True
+        if rotated:
+            lines = self._split(self.f.read(), flush=True)
+            self.close()
+            self._open(lines=None)
+            # the events of what the new file holds may already be consumed, read it now
+            if self.f is not None:
+                lines += self._split(self.f.read(self.batch_bytes))
+        return lines
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+
+def follow(
+    file_name,
+    lines=0,
+    remove_new_line=False,
+    encoding="utf-8",
+    errors="replace",
+    idle_timeout=None,
+    poll_interval=0.5,
+    batch_bytes=1 << 20,
+):
+    """
+    Follow a growing file like `tail -F`, yielding complete lines in batches.
+
+    The file is first positioned at its end, or at the start of its last `lines` lines.
+    Between reads the generator sleeps on inotify events (see `pyeff.fs.FileWatcher`) instead of
+    polling. When the file is truncated it restarts from the beginning, and when it is rotated,
+    i.e. the path now points to another inode, the rest of the old file is drained before the
+    new one is followed from its start.
+
+    Args:
+        file_name (str): The path to the file to follow.
+        lines (int, optional): The number of existing last lines to yield first. Defaults to 0.
+        remove_new_line (bool, optional): Whether to strip the trailing newline of each line. Defaults to False.
+        encoding (str, optional): The encoding used to decode lines. Defaults to "utf-8".
+        errors (str, optional): The decoding error handler. Defaults to "replace".
+        idle_timeout (float, optional): Stop after this many seconds without new lines. Defaults to None, follow forever.
+        poll_interval (float, optional): The polling interval when inotify is not available. Defaults to 0.5.
+        batch_bytes (int, optional): The maximum number of bytes read for one batch. Defaults to 1 MiB.
+
+    Yields:
+        list[str]: A non-empty batch of complete lines.
+    """
+    follower = _Follower(file_name, lines, remove_new_line, encoding, errors, batch_bytes)
+    try:
+        with FileWatcher([file_name], poll_interval=poll_interval) as watcher:
+            deadline = None if idle_timeout is None else time.monotonic() + idle_timeout
+            while True:
+                batch = follower.read()
+                if batch:
+                    yield batch
+                    if idle_timeout is not None:
+                        deadline = time.monotonic() + idle_timeout
+                    continue
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return
+                watcher.wait(timeout=remaining)
+    finally:
+        follower.close()
+
+
+async def afollow(
+    file_name,
+    lines=0,
+    remove_new_line=False,
+    encoding="utf-8",
+    errors="replace",
+    idle_timeout=None,
+    poll_interval=0.5,
+    batch_bytes=1 << 20,
+):
+    """
+    Asyncio variant of `follow`, an async generator yielding batches of complete lines.
+
+    The inotify file descriptor is registered with `loop.add_reader`, so waiting for new data
+    does not hold a thread. Arguments are the same as `follow`.
+
+    Example:
+        async for batch in afollow("./app.log", lines=10):
+            for line in batch:
+                print(line, end="")
+    """
+    loop = asyncio.get_running_loop()
+    follower = _Follower(file_name, lines, remove_new_line, encoding, errors, batch_bytes)
+    try:
+        with FileWatcher([file_name], poll_interval=poll_interval) as watcher:
+            deadline = None if idle_timeout is None else loop.time() + idle_timeout
+            event = asyncio.Event()
+            if watcher.fileno() is not None:
+                loop.add_reader(watcher.fileno(), event.set)
+            try:
+                while True:
+                    batch = follower.read()
+                    if batch:
+                        yield batch
+                        if idle_timeout is not None:
+                            deadline = loop.time() + idle_timeout
+                        continue
+
+                    remaining = None if deadline is None else deadline - loop.time()
+                    if remaining is not None and remaining <= 0:
+                        return
+
+                    if watcher.fileno() is None:
+                        await asyncio.sleep(
+                            poll_interval if remaining is None else min(poll_interval, remaining)
+                        )
+                    else:
+                        try:
+                            await asyncio.wait_for(event.wait(), remaining)
+                        except asyncio.TimeoutError:
+                            pass
+                        event.clear()
+                    watcher.changes()
+            finally:
+                if watcher.fileno() is not None:
+                    loop.remove_reader(watcher.fileno())
+    finally:
+        follower.close()
+
+
+def _myers_matches(a, b, alo, ahi, blo, bhi, max_d):
+    """
+    Myers O(ND) greedy diff of a[alo:ahi] and b[blo:bhi], on interned integer lines.
+
+    Returns:
+        list: The matched (i, j) index pairs, in reverse order, or None when the edit
+              distance exceeds `max_d`.
+    """
+    n = ahi - alo
+    m = bhi - blo
+    max_d = min(n + m, max_d)
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3)
+    trace = []
+
+    found = False
+    for d in range(max_d + 1):
+        trace.append(v[:])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                found = True
+                break
+        if found:
+            break
+
+    if not found:
+        return None
+
+    matches = []
+    x, y = n, m
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[offset + prev_k]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            matches.append((alo + x, blo + y))
+        x, y = prev_x, prev_y
+    return matches
+
+
+def _unique_anchors(a, b, alo, ahi, blo, bhi):
+    """
+    Patience anchors: the longest increasing run of lines occurring exactly once in both ranges.
+
+    Returns:
+        list: The anchor (i, j) index pairs, in increasing order.
+    """
+    a_counts = collections.Counter(a[alo:ahi])
+    b_counts = collections.Counter(b[blo:bhi])
+    b_unique = {x: j for j, x in enumerate(b[blo:bhi], blo) if b_counts[x] == 1}
+    pairs = [
+        (i, b_unique[x])
+        for i, x in enumerate(a[alo:ahi], alo)
+        if a_counts[x] == 1 and x in b_unique
+    ]
+    if not pairs:
+        return []
+
+    b_indexes = [j for _, j in pairs]
+    if all(map(operator.lt, b_indexes, b_indexes[1:])):
+        # no line moved, every unique pair is an anchor
+        return pairs
+
+    # longest increasing subsequence on the b indexes, by patience sorting
+    tails = []
+    tail_idx = []
+    prev = [-1] * len(pairs)
+    for p, (_, j) in enumerate(pairs):
+        pos = bisect.bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tail_idx.append(p)
+        else:
+            tails[pos] = j
+            tail_idx[pos] = p
+        prev[p] = tail_idx[pos - 1] if pos > 0 else -1
+
+    anchors = []
+    p = tail_idx[-1]
+    while p >= 0:
+        anchors.append(pairs[p])
+        p = prev[p]
+    anchors.reverse()
+    return anchors
+
+
+def diff_opcodes(a, b, max_d=1000):
+    """
+    Compute the opcodes turning the lines `a` into the lines `b`, in the same format as
+    `difflib.SequenceMatcher.get_opcodes`.
+
+    Lines are interned to integers first, and common prefixes and suffixes are trimmed.
+    Each remaining region is split on patience anchors, lines occurring exactly once on both
+    sides, and regions without anchors are diffed with the Myers algorithm. A region whose edit
+    distance exceeds `max_d` is split around its midpoint and each half is diffed again, so the
+    result stays close to minimal instead of turning into one large replace.
+
+    Args:
+        a (list of str): The old lines.
+        b (list of str): The new lines.
+        max_d (int, optional): The maximum edit distance searched by Myers in one region. Defaults to 1000.
+
+    Returns:
+        list of tuple: A list of (tag, i1, i2, j1, j2) with tag in 'equal', 'replace', 'delete', 'insert'.
+    """
+    table = {}
+    ia = list(map(table.setdefault, a, itertools.count()))
+    ib = list(map(table.setdefault, b, itertools.count(len(ia))))
+
+    # matching blocks as (i, j, size)
+    blocks = []
+    regions = [(0, len(ia), 0, len(ib))]
+    while regions:
+        alo, ahi, blo, bhi = regions.pop()
+
+        i, j = alo, blo
+        while alo < ahi and blo < bhi and ia[alo] == ib[blo]:
+            alo += 1
+            blo += 1
+        if alo > i:
+            blocks.append((i, j, alo - i))
+
+        i = ahi
+        while alo < ahi and blo < bhi and ia[ahi - 1] == ib[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+        if ahi < i:
+            blocks.append((ahi, bhi, i - ahi))
+
+        if alo == ahi or blo == bhi:
+            continue
+
+        anchors = _unique_anchors(ia, ib, alo, ahi, blo, bhi)
+        if anchors:
+            i, j = alo, blo
+            start = None
+            for ai, bj in anchors:
+                if start is not None and ai == i and bj == j:
+                    i, j = ai + 1, bj + 1
+                    continue
+                if start is not None:
+                    blocks.append((start[0], start[1], i - start[0]))
+                regions.append((i, ai, j, bj))
+                start = (ai, bj)
+                i, j = ai + 1, bj + 1
+            blocks.append((start[0], start[1], i - start[0]))
+            regions.append((i, ahi, j, bhi))
+        else:
+            found = _myers_matches(ia, ib, alo, ahi, blo, bhi, max_d)
+            if found is not None:
+                blocks.extend((i, j, 1) for i, j in found)
+            elif ahi - alo > 1 and bhi - blo > 1:
+                # too many edits for one search, split both ranges around their midpoint
+                amid = (alo + ahi) // 2
+                bmid = blo + (amid - alo) * (bhi - blo) // (ahi - alo)
+                bmid = min(max(bmid, blo + 1), bhi - 1)
+                regions.append((alo, amid, blo, bmid))
+                regions.append((amid, ahi, bmid, bhi))
+
+    blocks.sort()
+    blocks.append((len(ia), len(ib), 0))
+
+    codes = []
+    i = j = 0
+    for bi, bj, size in blocks:
+        if i < bi and j < bj:
+            codes.append(("replace", i, bi, j, bj))
+        elif i < bi:
+            codes.append(("delete", i, bi, j, bj))
+        elif j < bj:
+            codes.append(("insert", i, bi, j, bj))
+        if size:
+            if codes and codes[-1][0] == "equal":
+                codes[-1] = ("equal", codes[-1][1], bi + size, codes[-1][3], bj + size)
+            else:
+                codes.append(("equal", bi, bi + size, bj, bj + size))
+        i, j = bi + size, bj + size
+    return codes
+
+
+def diff_hunks(a, b, n=3, max_d=1000):
+    """
+    Compute structured unified-diff hunks between the lines `a` and the lines `b`.
+
+    Args:
+        a (list of str): The old lines.
+        b (list of str): The new lines.
+        n (int, optional): The number of context lines around each change. Defaults to 3.
+        max_d (int, optional): See `diff_opcodes`. Defaults to 1000.
+
+    Returns:
+        list of dict: One dict per hunk, with 0-based 'a_start', 'b_start', the line counts
+                      'a_count', 'b_count', and 'lines', a list of (tag, line) where tag is
+                      ' ' for context, '-' for a removed line and '+' for an added line.
+    """
+    codes = diff_opcodes(a, b, max_d=max_d)
+    if not codes or (len(codes) == 1 and codes[0][0] == "equal"):
+        return []
+
+    # trim context and split long equal runs, like difflib.SequenceMatcher.get_grouped_opcodes
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+
+    groups = []
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal" and i2 - i1 > 2 * n:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            groups.append(group)
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        groups.append(group)
+
+    hunks = []
+    for group in groups:
+        lines = []
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                lines.extend((" ", l) for l in a[i1:i2])
+                continue
+            if tag in ("replace", "delete"):
+                lines.extend(("-", l) for l in a[i1:i2])
+            if tag in ("replace", "insert"):
+                lines.extend(("+", l) for l in b[j1:j2])
+        hunks.append(
+            {
+                "a_start": group[0][1],
+                "a_count": group[-1][2] - group[0][1],
+                "b_start": group[0][3],
+                "b_count": group[-1][4] - group[0][3],
+                "lines": lines,
+            }
+        )
+    return hunks
+
+
+def _unified_range(start, count):
+    """
+    Format a hunk range like `difflib.unified_diff`, `start` being 0-based.
+    """
+    if count == 1:
+        return f"{start + 1}"
+    if count == 0:
+        return f"{start},0"
+    return f"{start + 1},{count}"
+
+
+def diff(a, b, n=3, fromfile="a", tofile="b", max_d=1000):
+    """
+    Compare two lists of lines and return a unified diff, like `difflib.unified_diff`
+    but much faster on large inputs, see `diff_opcodes` for the algorithm.
+
+    Args:
+        a (list of str): The old lines, with or without trailing newlines.
+        b (list of str): The new lines, with or without trailing newlines.
+        n (int, optional): The number of context lines around each change. Defaults to 3.
+        fromfile (str, optional): The name of the old file in the header. Defaults to "a".
+        tofile (str, optional): The name of the new file in the header. Defaults to "b".
+        max_d (int, optional): See `diff_opcodes`. Defaults to 1000.
+
+    Returns:
+        list[str]: The unified diff lines, each ending with a newline, empty if `a` and `b` are equal.
+    """
+    hunks = diff_hunks(a, b, n=n, max_d=max_d)
+    if not hunks:
+        return []
+
+    results = [f"--- {fromfile}\n", f"+++ {tofile}\n"]
+    for hunk in hunks:
+        a_range = _unified_range(hunk["a_start"], hunk["a_count"])
+        b_range = _unified_range(hunk["b_start"], hunk["b_count"])
+        results.append(f"@@ -{a_range} +{b_range} @@\n")
+        for tag, line in hunk["lines"]:
+            results.append(tag + line if line.endswith("\n") else tag + line + "\n")
+    return results
+
+
 def pair_match(lines, first, second):
     """
     Check if there exists a pair of consecutive elements in 'lines'
@@ -426,3 +1420,199 @@ def extract(lines, start, finish):
         j += 1
 
     return results, j
+
+
+def scan(lines, rules):
+    """
+    Run many `extract`, `pair_match` and `continue_match` style rules over the lines in a single pass,
+    returning every match of every rule instead of only the first one.
+
+    Every distinct predicate is evaluated once per line, and each rule is a small state machine fed
+    with those results, so many extractions over the same lines cost O(n) instead of one rescan per call.
+
+    Args:
+        lines (list of str): The lines to be scanned.
+        rules (dict): A dictionary where keys are rule names and values are dicts with a 'type' and its predicates:
+            - {"type": "extract", "start": f, "finish": g}: like `extract`, ranges from a start line to the next finish line.
+            - {"type": "pair", "first": f, "second": g}: like `pair_match`, `first` line followed by (or also being) a `second` line.
+            - {"type": "continue", "first": f, "second": g}: like `continue_match`, a `second` line right after exactly one `first` line.
+
+    Returns:
+        dict: Rule names mapped to lists of (begin, end) inclusive index pairs. For 'extract' an unfinished
+              last range ends at the last line. For 'pair' and 'continue', `end` is the index the
+              corresponding `*_match` function returns.
+
+    Example:
+        ranges = scan(lines, {
+            "doc": {"type": "extract", "start": is_doc, "finish": is_doc},
+            "has_doc": {"type": "pair", "first": is_def_end, "second": is_doc},
+        })
+    """
+    predicates = []
+    slots = {}
+    compiled = []
+    for name, rule in rules.items():
+        assert rule["type"] in ["extract", "pair", "continue"]
+        keys = ["start", "finish"] if rule["type"] == "extract" else ["first", "second"]
+        refs = []
+        for key in keys:
+            fn = rule[key]
+            if fn not in slots:
+                slots[fn] = len(predicates)
+                predicates.append(fn)
+            refs.append(slots[fn])
+        # state: begin index of an open range / last first line, or None
+        compiled.append([name, rule["type"], refs[0], refs[1], None])
+
+    results = {name: [] for name in rules}
+    last = len(lines) - 1
+    prev = None
+    for i, l in enumerate(lines):
+        values = [fn(l) for fn in predicates]
+
+        for state in compiled:
+            name, kind, a, b, begin = state
+            if kind == "extract":
+                if begin is None:
+                    if values[a]:
+                        state[4] = i
+                elif values[b]:
+                    results[name].append((begin, i))
+                    state[4] = None
+            elif kind == "pair":
+                if prev is not None and prev[a] and not prev[b] and values[b]:
+                    results[name].append((i - 1, i))
+                if i < last and values[a] and values[b]:
+                    results[name].append((i, i))
+            else:
+                if values[a]:
+                    state[4] = i if begin is None else -1
+                if values[b]:
+                    if state[4] is not None and state[4] >= 0:
+                        results[name].append((state[4], i))
+                    state[4] = None
+
+        prev = values
+
+    for name, kind, _, _, begin in compiled:
+        if kind == "extract" and begin is not None:
+            results[name].append((begin, last))
+
+    return results
+
+
+def chunk_ranges(file_name, chunks):
+    """
+    Split a file into at most `chunks` byte ranges of similar size, each ending right after a newline,
+    so that every range holds whole lines and can be processed independently.
+
+    Args:
+        file_name (str): The path to the file to split.
+        chunks (int): The wanted number of ranges.
+
+    Returns:
+        list of tuple: A list of (start, end) byte offsets, covering the whole file in order.
+    """
+    assert chunks > 0
+
+    with _mmap_file(file_name) as buf:
+        size = len(buf)
+        bounds = [0]
+        for k in range(1, chunks):
+            pos = max(size * k // chunks, bounds[-1])
+            new_line = buf.find(b"\n", pos)
+            if new_line < 0 or new_line + 1 >= size:
+                break
+            if new_line + 1 > bounds[-1]:
+                bounds.append(new_line + 1)
+        bounds.append(size)
+
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def _map_chunk(file_name, start, end, map_func):
+    """
+    Worker side of `map_chunks`: map the file, copy out one range and apply `map_func` to it.
+    """
+    with _mmap_file(file_name) as buf:
+        data = buf[start:end]
+    return map_func(data)
+
+
+def _count_chunk_new_lines(data):
+    return data.count(b"\n")
+
+
+def map_chunks(
+    file_name, map_func, reduce_func=None, workers=None, chunk_size=64 << 20
+):
+    """
+    Process a large file in parallel: split it into newline-aligned chunks with `chunk_ranges`,
+    apply `map_func` to each chunk in a process pool, then optionally fold the results with `reduce_func`.
+
+    Small files, a single chunk or a single worker are processed in the calling process.
+
+    Args:
+        file_name (str): The path to the file to process.
+        map_func (function): A picklable, module level, function taking the bytes of one chunk.
+        reduce_func (function, optional): A function folding two results into one, like `operator.add`. Defaults to None.
+        workers (int, optional): The number of worker processes. Defaults to `os.cpu_count()`.
+        chunk_size (int, optional): The target size in bytes of one chunk. Defaults to 64 MiB.
+
+    Returns:
+        The reduced result if `reduce_func` is given (None for an empty file), otherwise the list of
+        chunk results in file order.
+    """
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(file_name)
+    chunks = max(1, -(-size // chunk_size))
+    if chunks > 1:
+        chunks = max(chunks, workers)
+    ranges = chunk_ranges(file_name, chunks)
+
+    if len(ranges) <= 1 or workers == 1:
+        results = [_map_chunk(file_name, start, end, map_func) for start, end in ranges]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_map_chunk, file_name, start, end, map_func)
+                for start, end in ranges
+            ]
+            results = [f.result() for f in futures]
+
+    if reduce_func is None:
+        return results
+    if not results:
+        return None
+    return functools.reduce(reduce_func, results)
+
+
+def count_lines(file_name, workers=None, chunk_size=64 << 20):
+    """
+    Count the lines of a file, like `len(load_lines(file_name))`, without decoding it.
+
+    Newlines are counted with `bytes.count` over newline-aligned chunks, in parallel with `map_chunks`.
+
+    Args:
+        file_name (str): The path to the file.
+        workers (int, optional): The number of worker processes. Defaults to `os.cpu_count()`.
+        chunk_size (int, optional): The target size in bytes of one chunk. Defaults to 64 MiB.
+
+    Returns:
+        int: The number of lines, a last line without trailing newline included.
+    """
+    count = map_chunks(
+        file_name,
+        _count_chunk_new_lines,
+        operator.add,
+        workers=workers,
+        chunk_size=chunk_size,
+    )
+    if count is None:
+        return 0
+
+    with open(file_name, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            count += 1
+    return count
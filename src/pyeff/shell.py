@@ -1,26 +1,53 @@
 import os
+import sys
+import glob
+import time
+import shutil
+import signal
+import asyncio
+import tempfile
+import threading
 import subprocess
+import json
+import zlib
+import struct
+import tarfile
+import uuid
 import fnmatch
+import shlex
+import select
+import codecs
+import functools
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 from loguru import logger
 
+from .hash import hash_string, hash_file
+from .json import load_json, dump_json
+from .logger import logger_table_begin, logger_table_end
+
 def run_cmds(cmds, cwd=None, tip=None, check=False, join=False):
     """
     Executes a list of commands based on the specified parameters.
     
     Parameters:
-    - cmds (list or str): A list of commands or a single string command to be executed.
+    - cmds (list or str): A list of commands or a single string command to be executed. A command given as
+      an argv list, e.g. `["git", "status"]`, is spawned directly without `/bin/sh` and with a native `cwd`;
+      a string command goes through the shell.
     - cwd (str, optional): The working directory in which to execute the commands. Defaults to None.
     - tip (str, optional): A tip or message associated with the command execution. Defaults to None.
     - check (bool, optional): If True, the function will check the exit status of the commands. Defaults to False.
     - join (bool, optional): If True, commands are treated as a single string to be executed together. If False, they are executed separately. Defaults to False.
     
     This function chooses between _run_cmds_join and _run_cmds_split based on the 'join' flag.
+
+    Returns:
+    - int or list of int: The wait status (as `os.system` returns it) of the joined command, or of each command.
     """
     if join:
-        _run_cmds_join(cmds, cwd=cwd, tip=tip, check=check)
+        return _run_cmds_join(cmds, cwd=cwd, tip=tip, check=check)
     else:
-        _run_cmds_split(cmds, cwd=cwd, tip=tip, check=check)
+        return _run_cmds_split(cmds, cwd=cwd, tip=tip, check=check)
 
 
 def _run_cmds_join(cmds, cwd=None, tip=None, check=False):
@@ -42,7 +69,7 @@ def _run_cmds_join(cmds, cwd=None, tip=None, check=False):
     """
     head = f"{tip}: " if tip else ""
 
-    cmd = " ".join(cmds)
+    cmd = " ".join(_shell_cmd(c) for c in cmds)
 
     if cwd is not None:
         full_cmd = f"cd {cwd}&&{cmd}"
@@ -68,7 +95,7 @@ def _run_cmds_split(cmds, cwd=None, tip=None, check=False):
     providing a prefix tip for log messages, and checking for command success.
 
     Args:
-        cmds (list of str): The commands to be executed.
+        cmds (list of str or list): The commands to be executed, shell strings or argv lists.
         cwd (str, optional): The directory to change to before running each command. Defaults to None.
         tip (str, optional): A string to be prepended to each log message. Defaults to None.
         check (bool, optional): If True, asserts that each command returns a success exit code (0). Defaults to False.
@@ -79,14 +106,21 @@ def _run_cmds_split(cmds, cwd=None, tip=None, check=False):
     head = f"{tip}: " if tip is not None else ""
     rets = []
     for cmd in cmds:
-        if cwd is not None:
-            full_cmd = f"cd {cwd}&&{cmd}"
+        if isinstance(cmd, (list, tuple)):
+            full_cmd = _join_argv(cmd)
+
+            logger.info(f"{head}{full_cmd}")
+
+            ret = _spawn_argv(cmd, cwd)
         else:
-            full_cmd = cmd
+            if cwd is not None:
+                full_cmd = f"cd {cwd}&&{cmd}"
+            else:
+                full_cmd = cmd
 
-        logger.info(f"{head}{full_cmd}")
+            logger.info(f"{head}{full_cmd}")
 
-        ret = os.system(full_cmd)
+            ret = os.system(full_cmd)
 
         if ret != 0:
             logger.warning(f"{head}run cmd failed, ret:{ret}, cmd:{full_cmd}")
@@ -97,16 +131,1079 @@ def _run_cmds_split(cmds, cwd=None, tip=None, check=False):
         rets.append(ret)
     return rets
 
-def compress_to_tar_gz(target_directory, file_list, output_tar_gz):
+def _join_argv(argv):
+    """
+    Quote an argv list into a shell command, like `shlex.join` of Python 3.8.
+    """
+    return " ".join(shlex.quote(str(arg)) for arg in argv)
+
+
+def _exit_code(status):
+    """
+    Convert a wait status to an exit code, negative signal number if killed, like `os.waitstatus_to_exitcode` of Python 3.9.
+    """
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _glob_relative(pattern, cwd):
+    """
+    The paths matching a glob relative to `cwd`, relative to it, like `glob.glob(root_dir=cwd)` of Python 3.10.
+    """
+    if os.path.isabs(pattern):
+        return glob.glob(pattern, recursive=True)
+    return [
+        os.path.relpath(path, cwd)
+        for path in glob.glob(os.path.join(glob.escape(cwd), pattern), recursive=True)
+    ]
+
+
+def _shell_cmd(cmd):
+    """
+    The shell form of a command, argv lists being quoted with `_join_argv`.
+    """
+    if isinstance(cmd, (list, tuple)):
+        return _join_argv(cmd)
+    return cmd
+
+
+def _spawn_argv(argv, cwd=None):
+    """
+    Run an argv list directly, without a `/bin/sh` in between, and wait for it.
+
+    Without `cwd` the process is started by `os.posix_spawnp` (Python 3.8+), otherwise by `subprocess.Popen`,
+    which passes `cwd` to the child natively.
+
+    Args:
+        argv (list of str): The program, looked up in PATH, and its arguments.
+        cwd (str, optional): The working directory of the process. Defaults to None.
+
+    Returns:
+        int: The wait status, like `os.system` returns, 127 << 8 when the program or `cwd` does not exist.
+    """
+    argv = [str(arg) for arg in argv]
+    proc = None
+    try:
+        if cwd is None and hasattr(os, "posix_spawnp"):
+            pid = os.posix_spawnp(argv[0], argv, os.environ)
+        else:
+            proc = subprocess.Popen(argv, cwd=cwd, close_fds=False)
+            pid = proc.pid
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        return 127 << 8
+    _, status = os.waitpid(pid, 0)
+    if proc is not None:
+        proc.returncode = _exit_code(status)
+    return status
+
+
+def _wait_usage(proc, start):
+    """
+    Reap a child process with `os.wait4`, collecting its resource usage, which on Linux
+    includes the descendants it waited for, like the commands run by `sh -c`. Note that 'maxrss'
+    is a high-water mark, a tiny command may report the RSS of the forked Python process.
+
+    Args:
+        proc (subprocess.Popen): The child process.
+        start (float): The `time.time()` the process was started at.
+
+    Returns:
+        tuple: A tuple (ret, usage) with the return code and a dict with 'wall', 'user' and 'sys' seconds,
+               'maxrss' (KiB on Linux), and 'inblock' / 'oublock' block I/O operation counts.
+    """
+    _, status, ru = os.wait4(proc.pid, 0)
+    proc.returncode = _exit_code(status)
+    return proc.returncode, {
+        "wall": time.time() - start,
+        "user": ru.ru_utime,
+        "sys": ru.ru_stime,
+        "maxrss": ru.ru_maxrss,
+        "inblock": ru.ru_inblock,
+        "oublock": ru.ru_oublock,
+    }
+
+
+def _run_usage(cmd, cwd):
+    """
+    Run a shell string or an argv list and reap it with `_wait_usage`.
+
+    Returns:
+        tuple: (ret, usage), (127, None) when the program of an argv list or `cwd` does not exist, like a shell reports it.
+    """
+    start = time.time()
+    try:
+        proc = subprocess.Popen(cmd, shell=isinstance(cmd, str), cwd=cwd)
+    except (FileNotFoundError, NotADirectoryError, PermissionError) as e:
+        logger.warning(f"run cmd failed to start: {e}")
+        return 127, None
+    return _wait_usage(proc, start)
+
+
+def log_usage_table(results, title="resource usage"):
+    """
+    Log the resource usage of commands as a table, between `logger_table_begin` and `logger_table_end`.
+
+    Args:
+        results (list of dict): Results with 'cmd' and 'usage' keys, like `profile_cmds` returns.
+                                Results without usage, e.g. skipped commands, are ignored.
+        title (str, optional): The table title. Defaults to "resource usage".
+    """
+    logger_table_begin(title)
+    logger.info(
+        f"{'wall(s)':>9} {'user(s)':>9} {'sys(s)':>9} {'maxrss(KB)':>11} {'in':>8} {'out':>8}  cmd"
+    )
+    total = 0
+    for r in results:
+        usage = r.get("usage")
+        if usage is None:
+            continue
+        total += usage["wall"]
+        logger.info(
+            f"{usage['wall']:>9.3f} {usage['user']:>9.3f} {usage['sys']:>9.3f} "
+            f"{usage['maxrss']:>11} {usage['inblock']:>8} {usage['oublock']:>8}  {r['cmd']}"
+        )
+    logger_table_end(f"total wall: {total:.3f}s")
+
+
+def profile_cmds(cmds, cwd=None, tip=None, check=False, log_table=True):
+    """
+    Executes a list of commands one after another, like `run_cmds`, and measures each of them.
+
+    Every command is reaped with `os.wait4`, which gives its wall time, user and sys CPU time,
+    max RSS and block I/O counts, including those of the processes the command's shell waited for.
+
+    Parameters:
+    - cmds (list of str): The commands to be executed, shell strings or argv lists run without a shell.
+    - cwd (str, optional): The working directory in which to execute the commands. Defaults to None.
+    - tip (str, optional): A prefix message for logging purposes. Defaults to None.
+    - check (bool, optional): If True, asserts that each command returns a success exit code (0). Defaults to False.
+    - log_table (bool, optional): If True, logs a summary table with `log_usage_table`. Defaults to True.
+
+    Returns:
+    - list of dict: One dict per command with 'cmd', 'ret' and 'usage', see `_wait_usage`, usage is None when the command could not be started.
+    """
+    head = f"{tip}: " if tip is not None else ""
+    results = []
+    try:
+        for cmd in cmds:
+            logger.info(f"{head}{cmd}")
+
+            ret, usage = _run_usage(cmd, cwd)
+
+            if ret != 0:
+                logger.warning(f"{head}run cmd failed, ret:{ret}, cmd:{cmd}")
+
+            results.append({"cmd": cmd, "ret": ret, "usage": usage})
+
+            if check:
+                assert ret == 0
+    finally:
+        if log_table:
+            log_usage_table(results, title=f"{head}resource usage")
+
+    return results
+
+
+def _run_graph_node(name, cmd, cwd, head):
+    """
+    Run one command of `run_cmds_graph` through the shell and time it.
+
+    Returns:
+        dict: The report entry of the command.
+    """
+    logger.info(f"{head}[{name}] {cmd}")
+
+    start = time.time()
+    ret, usage = _run_usage(cmd, cwd)
+    end = time.time()
+
+    if ret != 0:
+        logger.warning(f"{head}run cmd failed, ret:{ret}, cmd:{cmd}")
+
+    return {
+        "cmd": cmd,
+        "ret": ret,
+        "status": "ok" if ret == 0 else "failed",
+        "start": start,
+        "end": end,
+        "elapsed": end - start,
+        "usage": usage,
+    }
+
+
+def run_cmds_graph(cmds, cwd=None, tip=None, check=False, jobs=None):
+    """
+    Executes commands concurrently, respecting their dependencies.
+
+    Parameters:
+    - cmds (dict or list): Command names mapped to either a command string, or a dict with
+      'cmd', optional 'depends_on' (list of command names) and optional 'cwd'. A 'cmd' given as
+      an argv list is spawned without a shell.
+      A list of command strings is taken as independent commands named by their index.
+    - cwd (str, optional): The default working directory of the commands. Defaults to None.
+    - tip (str, optional): A prefix message for logging purposes. Defaults to None.
+    - check (bool, optional): If True, a failed command cancels all the commands depending on it,
+      directly or not. If False, dependents still run. Defaults to False.
+    - jobs (int, optional): The maximum number of commands running at once. Defaults to `os.cpu_count()`.
+
+    Returns:
+    - dict: Command names, in input order, mapped to a report dict with 'cmd', 'ret' (None if skipped),
+      'status' ('ok', 'failed' or 'skipped'), the 'start', 'end' and 'elapsed' times in seconds, and the
+      'usage' of the command (None if skipped or not started), see `profile_cmds`. Use `log_usage_table(report.values())`
+      to log it as a table.
+
+    Raises:
+    - ValueError: If a dependency is unknown or the dependencies contain a cycle.
+
+    Example:
+        run_cmds_graph({
+            "lib": "make -C lib",
+            "app": {"cmd": "make -C app", "depends_on": ["lib"]},
+            "doc": "make -C doc",
+        }, jobs=4, check=True)
+    """
+    head = f"{tip}: " if tip is not None else ""
+    jobs = jobs or os.cpu_count() or 1
+
+    if isinstance(cmds, (list, tuple)):
+        cmds = dict(enumerate(cmds))
+
+    specs = {}
+    for name, spec in cmds.items():
+        if not isinstance(spec, dict):
+            spec = {"cmd": spec}
+        specs[name] = {
+            "cmd": spec["cmd"],
+            "depends_on": list(dict.fromkeys(spec.get("depends_on", []))),
+            "cwd": spec.get("cwd", cwd),
+        }
+
+    dependents = {name: [] for name in specs}
+    pending = {}
+    for name, spec in specs.items():
+        for dep in spec["depends_on"]:
+            if dep not in specs:
+                raise ValueError(f"command '{name}' depends on unknown command '{dep}'")
+            dependents[dep].append(name)
+        pending[name] = set(spec["depends_on"])
+
+    # reject cycles up front, by a topological sort
+    in_degree = {name: len(deps) for name, deps in pending.items()}
+    queue = [name for name, degree in in_degree.items() if degree == 0]
+    visited = 0
+    while queue:
+        node = queue.pop()
+        visited += 1
+        for dep in dependents[node]:
+            in_degree[dep] -= 1
+            if in_degree[dep] == 0:
+                queue.append(dep)
+    if visited != len(specs):
+        raise ValueError("command dependencies contain a cycle")
+
+    report = {}
+
+    def skip(name):
+        if name in report:
+            return
+        logger.warning(f"{head}skip cmd [{name}], a dependency failed")
+        report[name] = {
+            "cmd": specs[name]["cmd"],
+            "ret": None,
+            "status": "skipped",
+            "start": None,
+            "end": None,
+            "elapsed": 0,
+            "usage": None,
+        }
+        for dep in dependents[name]:
+            skip(dep)
+
+    ready = [name for name, deps in pending.items() if not deps]
+    running = {}
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while ready or running:
+            while ready and len(running) < jobs:
+                name = ready.pop(0)
+                spec = specs[name]
+                future = executor.submit(
+                    _run_graph_node, name, spec["cmd"], spec["cwd"], head
+                )
+                running[future] = name
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                result = future.result()
+                report[name] = result
+
+                for dep in dependents[name]:
+                    if check and result["ret"] != 0:
+                        skip(dep)
+                        continue
+                    pending[dep].discard(name)
+                    if not pending[dep] and dep not in report:
+                        ready.append(dep)
+
+    return {name: report[name] for name in specs}
+
+
+async def _pump_lines(stream, on_line):
+    """
+    Read a subprocess stream in chunks and call `on_line` for every complete line,
+    plus the trailing partial line at end of stream.
+    """
+    pending = b""
+    while True:
+        chunk = await stream.read(1 << 16)
+        if not chunk:
+            break
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            on_line(line.decode("utf-8", "replace"))
+    if pending:
+        on_line(pending.decode("utf-8", "replace"))
+
+
+async def _arun_cmd(cmd, cwd, head, timeout, on_output):
+    """
+    Run one shell command with asyncio in its own process group, streaming its output.
+    The process group is killed on timeout, and when the task is cancelled.
+
+    Returns:
+        int: The return code, negative signal number if killed, -9 on timeout.
+    """
+    logger.info(f"{head}{cmd}")
+
+    if on_output is None:
+        on_output = lambda cmd, stream, line: logger.info(f"{head}{line}")
+
+    proc = await asyncio.create_subprocess_shell(
+        cmd,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=True,
+    )
+    pumps = [
+        asyncio.ensure_future(
+            _pump_lines(proc.stdout, lambda line: on_output(cmd, "stdout", line))
+        ),
+        asyncio.ensure_future(
+            _pump_lines(proc.stderr, lambda line: on_output(cmd, "stderr", line))
+        ),
+    ]
+
+    try:
+        await asyncio.wait_for(asyncio.gather(proc.wait(), *pumps), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"{head}run cmd timeout after {timeout}s, kill: {cmd}")
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+    except BaseException:
+        # cancelled, or interrupted: do not leave the command running
+        if proc.returncode is None:
+            logger.warning(f"{head}run cmd cancelled, kill: {cmd}")
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await asyncio.shield(proc.wait())
+        raise
+    finally:
+        for pump in pumps:
+            pump.cancel()
+
+    ret = proc.returncode
+    if ret != 0:
+        logger.warning(f"{head}run cmd failed, ret:{ret}, cmd:{cmd}")
+    return ret
+
+
+async def arun_cmds(
+    cmds,
+    cwd=None,
+    tip=None,
+    check=False,
+    join=False,
+    timeout=None,
+    on_output=None,
+    jobs=1,
+):
+    """
+    Asyncio version of `run_cmds`, built on `asyncio.create_subprocess_shell`.
+
+    Output is streamed line by line while the commands run, to `pyeff.logger` by default,
+    and each command runs in its own process group, so that a timeout kills it with all its children.
+
+    Parameters:
+    - cmds (list or str): A list of commands or a single string command to be executed.
+    - cwd (str, optional): The working directory in which to execute the commands. Defaults to None.
+    - tip (str, optional): A prefix message for logging purposes. Defaults to None.
+    - check (bool, optional): If True, asserts that every command returns a success exit code (0). Defaults to False.
+    - join (bool, optional): If True, commands are joined into a single command string. Defaults to False.
+    - timeout (float, optional): Seconds after which a command is killed. Defaults to None, no timeout.
+    - on_output (function, optional): A callback `on_output(cmd, stream, line)` with stream "stdout" or "stderr".
+      Defaults to None, logging every line with `logger.info`.
+    - jobs (int, optional): The maximum number of commands in flight at once. Defaults to 1, one after another.
+
+    Returns:
+    - list of int: The exit codes, in the order of the commands.
+
+    Example:
+        rets = await arun_cmds(["make -C a", "make -C b"], jobs=2, timeout=600)
+    """
+    head = f"{tip}: " if tip is not None else ""
+
+    if isinstance(cmds, str):
+        cmds = [cmds]
+    if join:
+        cmds = [" ".join(cmds)]
+
+    if jobs == 1:
+        rets = []
+        for cmd in cmds:
+            ret = await _arun_cmd(cmd, cwd, head, timeout, on_output)
+            if check:
+                assert ret == 0
+            rets.append(ret)
+        return rets
+
+    semaphore = asyncio.Semaphore(jobs)
+
+    async def run(cmd):
+        async with semaphore:
+            return await _arun_cmd(cmd, cwd, head, timeout, on_output)
+
+    rets = await asyncio.gather(*[run(cmd) for cmd in cmds])
+    if check:
+        assert all(ret == 0 for ret in rets)
+    return list(rets)
+
+
+class RingBuffer(object):
+    """
+    A bytes sink keeping only the last `max_bytes` bytes written to it.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._buf = bytearray()
+
+    def write(self, data):
+        self.size += len(data)
+        self._buf += data
+        if len(self._buf) > self.max_bytes:
+            del self._buf[: len(self._buf) - self.max_bytes]
+
+    def getvalue(self):
+        return bytes(self._buf)
+
+
+def _drain_pipe(pipe, sink, on_line, stream, sizes):
+    """
+    Read a pipe until EOF, in chunks, feeding the capture sink and the line callback,
+    and record the total number of bytes read in `sizes[stream]`.
+    """
+    pending = b""
+    while True:
+        chunk = pipe.read1(1 << 16)
+        if not chunk:
+            break
+        sizes[stream] += len(chunk)
+        if sink is not None:
+            sink.write(chunk)
+        if on_line is not None:
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                on_line(stream, line.decode("utf-8", "replace"))
+    if on_line is not None and pending:
+        on_line(stream, pending.decode("utf-8", "replace"))
+    pipe.close()
+
+
+def run_cmd_capture(
+    cmd,
+    cwd=None,
+    tip=None,
+    check=False,
+    capture="ring",
+    max_bytes=64 * 1024,
+    on_line=None,
+):
+    """
+    Executes one shell command and captures its output with bounded memory.
+
+    stdout and stderr are drained concurrently by two threads, so a command filling one pipe
+    while we wait on the other can not deadlock.
+
+    Parameters:
+    - cmd (str): The command to be executed.
+    - cwd (str, optional): The working directory in which to execute the command. Defaults to None.
+    - tip (str, optional): A prefix message for logging purposes. Defaults to None.
+    - check (bool, optional): If True, asserts that the command returns a success exit code (0). Defaults to False.
+    - capture (str, optional): The capture mode of each stream, one of:
+        - "ring": keep only the last `max_bytes` bytes in memory, returned as bytes.
+        - "spill": keep up to `max_bytes` bytes in memory, then spill to a temporary file, returned as
+          a file object positioned at the start, to be closed by the caller.
+        - None: keep nothing, typically with `on_line`.
+      Defaults to "ring".
+    - max_bytes (int, optional): The ring size or spill threshold, per stream. Defaults to 64 KiB.
+    - on_line (function, optional): A callback `on_line(stream, line)` called for every output line while
+      the command runs, with stream "stdout" or "stderr". Defaults to None.
+
+    Returns:
+    - dict: A dict with 'cmd', 'ret', 'stdout' and 'stderr' (as described by `capture`), the
+      total number of bytes produced in 'stdout_size' and 'stderr_size', and the 'usage' of the
+      command, see `profile_cmds`.
+    """
+    assert capture in ["ring", "spill", None]
+
+    head = f"{tip}: " if tip is not None else ""
+    logger.info(f"{head}{cmd}")
+
+    def make_sink():
+        if capture == "ring":
+            return RingBuffer(max_bytes)
+        if capture == "spill":
+            return tempfile.SpooledTemporaryFile(max_size=max_bytes)
+        return None
+
+    sinks = {"stdout": make_sink(), "stderr": make_sink()}
+    sizes = {"stdout": 0, "stderr": 0}
+
+    start = time.time()
+    proc = subprocess.Popen(
+        cmd, shell=True, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    threads = [
+        threading.Thread(
+            target=_drain_pipe,
+            args=(pipe, sinks[stream], on_line, stream, sizes),
+        )
+        for stream, pipe in [("stdout", proc.stdout), ("stderr", proc.stderr)]
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ret, usage = _wait_usage(proc, start)
+
+    if ret != 0:
+        logger.warning(f"{head}run cmd failed, ret:{ret}, cmd:{cmd}")
+
+    if check:
+        assert ret == 0
+
+    result = {"cmd": cmd, "ret": ret, "usage": usage}
+    for stream, sink in sinks.items():
+        if capture == "ring":
+            sink = sink.getvalue()
+        elif capture == "spill":
+            sink.seek(0)
+        result[stream] = sink
+        result[f"{stream}_size"] = sizes[stream]
+    return result
+
+
+class CmdCache(object):
+    """
+    A local, content-addressed cache of command results, evicted in least recently used order.
+
+    Each entry is a directory named by the command key, holding `meta.json`, the captured
+    `stdout` and `stderr`, and a copy of the declared output files under `outputs/`.
+    See `run_cmd_cached`.
+    """
+
+    def __init__(self, cache_dir, max_bytes=1 << 30):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, cmd, cwd, inputs, env_keys):
+        """
+        Compute the key of a command from its string, cwd, chosen environment variables
+        and the content digest of every file matching the input globs.
+
+        :return: The hexadecimal key.
+        """
+        input_digests = []
+        for pattern in inputs:
+            files = sorted(_glob_relative(pattern, cwd))
+            input_digests.append(
+                [
+                    pattern,
+                    [
+                        [f, hash_file(os.path.join(cwd, f))]
+                        for f in files
+                        if os.path.isfile(os.path.join(cwd, f))
+                    ],
+                ]
+            )
+
+        return hash_string(
+            json.dumps(
+                {
+                    "cmd": cmd,
+                    "cwd": cwd,
+                    "env": {k: os.environ.get(k) for k in sorted(env_keys)},
+                    "inputs": input_digests,
+                }
+            )
+        )
+
+    def get(self, key):
+        """
+        Look up an entry, marking it as recently used.
+
+        :return: The entry directory, or None on a miss.
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        meta_file = os.path.join(entry_dir, "meta.json")
+        if not os.path.exists(meta_file):
+            return None
+        os.utime(meta_file)
+        return entry_dir
+
+    def put(self, key, meta, stdout, stderr, cwd, outputs):
+        """
+        Store an entry atomically, then evict old entries past `max_bytes`.
+
+        :param meta: The dict saved as `meta.json`.
+        :param stdout: The captured stdout, bytes or a binary file object streamed from its position.
+        :param stderr: The captured stderr, bytes or a binary file object streamed from its position.
+        :param cwd: The directory the outputs are relative to.
+        :param outputs: The output globs, relative to `cwd`.
+        """
+        tmp_dir = tempfile.mkdtemp(prefix=f".{key}.", dir=self.cache_dir)
+        try:
+            files = []
+            for pattern in outputs:
+                for f in sorted(_glob_relative(pattern, cwd)):
+                    if not os.path.isfile(os.path.join(cwd, f)):
+                        continue
+                    assert not os.path.normpath(f).startswith(".."), f"output '{f}' is outside cwd"
+                    dst = os.path.join(tmp_dir, "outputs", f)
+                    os.makedirs(os.path.dirname(dst), exist_ok=True)
+                    shutil.copy2(os.path.join(cwd, f), dst)
+                    files.append(f)
+
+            for stream, data in [("stdout", stdout), ("stderr", stderr)]:
+                with open(os.path.join(tmp_dir, stream), "wb") as f:
+                    if isinstance(data, bytes):
+                        f.write(data)
+                    else:
+                        shutil.copyfileobj(data, f, 1 << 20)
+            dump_json(dict(meta, outputs=files), os.path.join(tmp_dir, "meta.json"))
+
+            try:
+                os.rename(tmp_dir, os.path.join(self.cache_dir, key))
+            except OSError:
+                # stored concurrently by another run
+                pass
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self.evict()
+
+    def restore(self, entry_dir, cwd):
+        """
+        Copy the outputs of an entry back into `cwd`.
+
+        :return: The entry meta dict.
+        """
+        meta = load_json(os.path.join(entry_dir, "meta.json"))
+        for f in meta["outputs"]:
+            dst = os.path.join(cwd, f)
+            os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+            shutil.copy2(os.path.join(entry_dir, "outputs", f), dst)
+        return meta
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache fits in `max_bytes`.
+        """
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            meta_file = os.path.join(entry_dir, "meta.json")
+            if name.startswith(".") or not os.path.exists(meta_file):
+                continue
+            size = 0
+            for root, _, files in os.walk(entry_dir):
+                size += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+            entries.append((os.path.getmtime(meta_file), size, entry_dir))
+            total += size
+
+        for _, size, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+
+
+def run_cmd_cached(
+    cmd,
+    cache,
+    inputs=None,
+    outputs=None,
+    env_keys=None,
+    cwd=None,
+    tip=None,
+    check=False,
+):
+    """
+    Executes one shell command, unless an identical run is found in the cache.
+
+    The cache key covers the command string, the absolute cwd, the values of `env_keys`
+    and a `pyeff.hash.hash_file` digest of every file matching the `inputs` globs. On a hit the
+    declared `outputs` files are restored and the captured output is replayed, without running
+    anything. On a miss the command runs with its output streamed and captured, and only
+    successful runs are stored.
+
+    Parameters:
+    - cmd (str): The command to be executed.
+    - cache (CmdCache or str): The cache, or its directory.
+    - inputs (list of str, optional): Globs, relative to cwd, of the files the command reads. Defaults to None.
+    - outputs (list of str, optional): Globs, relative to cwd, of the files the command writes. Defaults to None.
+    - env_keys (list of str, optional): Names of environment variables the command depends on. Defaults to None.
+    - cwd (str, optional): The working directory in which to execute the command. Defaults to the current directory.
+    - tip (str, optional): A prefix message for logging purposes. Defaults to None.
+    - check (bool, optional): If True, asserts that the command returns a success exit code (0). Defaults to False.
+
+    Returns:
+    - dict: A dict with 'cmd', 'ret', 'key' and 'cached', True on a cache hit.
+
+    Example:
+        run_cmd_cached(
+            "gcc -o build/app src/*.c",
+            CmdCache("~/.cache/pyeff", max_bytes=1 << 30),
+            inputs=["src/**/*.c", "src/**/*.h"],
+            outputs=["build/app"],
+            env_keys=["CFLAGS"],
+        )
+    """
+    head = f"{tip}: " if tip is not None else ""
+    if not isinstance(cache, CmdCache):
+        cache = CmdCache(os.path.expanduser(cache))
+    cwd = os.path.abspath(cwd or os.getcwd())
+    inputs = inputs or []
+    outputs = outputs or []
+
+    key = cache.key(cmd, cwd, inputs, env_keys or [])
+    entry_dir = cache.get(key)
+    if entry_dir is not None:
+        logger.info(f"{head}[cached] {cmd}")
+        meta = cache.restore(entry_dir, cwd)
+        for stream, out in [("stdout", sys.stdout), ("stderr", sys.stderr)]:
+            # replayed in blocks, a char cut by a block boundary is decoded with the next one
+            decoder = codecs.getincrementaldecoder("utf-8")("replace")
+            with open(os.path.join(entry_dir, stream), "rb") as f:
+                for block in iter(functools.partial(f.read, 1 << 20), b""):
+                    out.write(decoder.decode(block))
+            out.write(decoder.decode(b"", final=True))
+            out.flush()
+        return {"cmd": cmd, "ret": meta["ret"], "key": key, "cached": True}
+
+    def echo(stream, line):
+        print(line, file=sys.stdout if stream == "stdout" else sys.stderr)
+
+    result = run_cmd_capture(
+        cmd, cwd=cwd, tip=tip, check=check, capture="spill", max_bytes=1 << 20, on_line=echo
+    )
+    try:
+        if result["ret"] == 0:
+            cache.put(
+                key,
+                {"cmd": cmd, "ret": result["ret"], "created": time.time()},
+                result["stdout"],
+                result["stderr"],
+                cwd,
+                outputs,
+            )
+    finally:
+        result["stdout"].close()
+        result["stderr"].close()
+
+    return {"cmd": cmd, "ret": result["ret"], "key": key, "cached": False}
+
+
+class ShellSession(object):
+    """
+    A long-lived bash process running many commands, one after another, without spawning a shell per command.
+
+    Commands are written to the shell stdin as quoted `eval` arguments, so a command bash can not parse
+    fails with a syntax error instead of swallowing what follows, each followed by a sentinel line carrying
+    its exit code and the shell working directory, so `cd` and `export` persist between commands. Command
+    stdin is redirected from /dev/null and stderr is merged into stdout. If the shell dies, e.g. on `exit`,
+    or a command runs over `timeout`, the shell and its process group are killed and it is restarted in
+    the last known working directory, exported variables are lost in that case.
+
+    Example:
+        with ShellSession(cwd="./build") as session:
+            session.run("export CC=clang")
+            ret, output = session.run("make -j8")
+            rets = session.run_cmds(["cd sub", "ls"], check=True)
+    """
+
+    def __init__(self, cwd=None, env=None, shell="bash", tip=None, timeout=None):
+        self.cwd = os.path.abspath(cwd or os.getcwd())
+        self.env = env
+        self.shell = shell
+        self.timeout = timeout
+        self.head = f"{tip}: " if tip is not None else ""
+        self.marker = f"__pyeff_{uuid.uuid4().hex}__"
+        self.proc = None
+        self._start()
+
+    def _start(self):
+        self.proc = subprocess.Popen(
+            [self.shell, "--noprofile", "--norc"],
+            cwd=self.cwd,
+            env=self.env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+
+    def _restart(self):
+        logger.warning(f"{self.head}shell session exited, restart in {self.cwd}")
+        self.close()
+        self._start()
+
+    def run(self, cmd, check=False, timeout=None):
+        """
+        Run one command in the session.
+
+        :param cmd: The command to be executed.
+        :param check: If True, asserts that the command returns a success exit code (0).
+        :param timeout: The maximum number of seconds to wait for the command, then the shell is killed
+                        and restarted and the exit code is -9. Defaults to the session `timeout`.
+        :return: A tuple (ret, output) with the exit code and the decoded stdout and stderr output.
+        """
+        logger.info(f"{self.head}{cmd}")
+
+        script = (
+            f"eval {shlex.quote(cmd)} < /dev/null\n"
+            f"printf '%s %d %s\\n' '{self.marker}' \"$?\" \"$PWD\"\n"
+        )
+        if self.proc.poll() is not None:
+            self._restart()
+        try:
+            self.proc.stdin.write(script.encode("utf-8"))
+            self.proc.stdin.flush()
+        except BrokenPipeError:
+            self._restart()
+            self.proc.stdin.write(script.encode("utf-8"))
+            self.proc.stdin.flush()
+
+        if timeout is None:
+            timeout = self.timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        marker = self.marker.encode("utf-8")
+        fd = self.proc.stdout.fileno()
+        buf = b""
+        output = []
+        ret = None
+        while True:
+            i = buf.find(marker)
+            if i >= 0:
+                end = buf.find(b"\n", i)
+                if end >= 0:
+                    output.append(buf[:i])
+                    code, cwd = buf[i + len(marker) : end].decode("utf-8").strip().split(" ", 1)
+                    ret = int(code)
+                    self.cwd = cwd
+                    break
+            elif len(buf) > len(marker):
+                # keep a tail which may hold the beginning of the marker
+                output.append(buf[: -len(marker)])
+                buf = buf[-len(marker) :]
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                logger.warning(f"{self.head}run cmd timeout after {timeout}s, cmd:{cmd}")
+                output.append(buf)
+                os.killpg(self.proc.pid, signal.SIGKILL)
+                self.proc.wait()
+                ret = -9
+                self._restart()
+                break
+
+            readable, _, _ = select.select([fd], [], [], remaining)
+            if not readable:
+                continue
+            data = os.read(fd, 65536)
+            if not data:
+                # the shell exited while running the command
+                output.append(buf)
+                ret = self.proc.wait()
+                self._restart()
+                break
+            buf += data
+
+        if ret != 0:
+            logger.warning(f"{self.head}run cmd failed, ret:{ret}, cmd:{cmd}")
+
+        if check:
+            assert ret == 0
+
+        return ret, b"".join(output).decode("utf-8", "replace")
+
+    def run_cmds(self, cmds, check=False):
+        """
+        Run a list of commands in the session, like `run_cmds` does with separate shells.
+
+        :param cmds: The commands to be executed.
+        :param check: If True, asserts that each command returns a success exit code (0).
+        :return: The list of exit codes.
+        """
+        return [self.run(cmd, check=check)[0] for cmd in cmds]
+
+    def close(self):
+        """
+        Terminate the shell process.
+        """
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        try:
+            self.proc.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+        self.proc.stdout.close()
+        self.proc = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ParallelGzipWriter(object):
+    """
+    A write-only file object producing a gzip stream, compressed on several threads like pigz.
+
+    Written data is cut into blocks, each block is deflated independently in a thread pool
+    (zlib releases the GIL), primed with the last 32 KiB of the previous block as dictionary,
+    and flushed to a byte boundary so the compressed blocks can simply be concatenated into
+    one valid gzip member. The CRC and size trailer are computed in the writing thread.
+
+    Example:
+        with open("data.gz", "wb") as f, ParallelGzipWriter(f, threads=8) as gz:
+            gz.write(data)
+    """
+
+    def __init__(self, fileobj, level=6, threads=None, block_size=1 << 20):
+        self.fileobj = fileobj
+        self.level = level
+        self.threads = threads or os.cpu_count() or 1
+        self.block_size = block_size
+        self.crc = 0
+        self.size = 0
+        self._buf = bytearray()
+        self._dict = b""
+        self._pending = []
+        self._executor = ThreadPoolExecutor(max_workers=self.threads)
+        self._closed = False
+
+        # magic, deflate, no flags, mtime, no extra flags, unknown OS
+        self.fileobj.write(
+            b"\x1f\x8b\x08\x00" + struct.pack("<I", int(time.time())) + b"\x00\xff"
+        )
+
+    def _compress(self, block, zdict, last):
+        if zdict:
+            c = zlib.compressobj(self.level, zlib.DEFLATED, -15, zdict=zdict)
+        else:
+            c = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        return c.compress(block) + c.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+    def _submit(self, block, last=False):
+        self._pending.append(
+            self._executor.submit(self._compress, block, self._dict, last)
+        )
+        self._dict = block[-32768:]
+        # keep a bounded number of blocks in flight
+        while len(self._pending) > 2 * self.threads:
+            self.fileobj.write(self._pending.pop(0).result())
+
+    def write(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        self._buf += data
+        while len(self._buf) >= self.block_size:
+            self._submit(bytes(self._buf[: self.block_size]))
+            del self._buf[: self.block_size]
+        return len(data)
+
+    def close(self):
+        """
+        Compress the last block, write all blocks and the gzip trailer. The underlying file is not closed.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._submit(bytes(self._buf), last=True)
+        self._buf = bytearray()
+        for future in self._pending:
+            self.fileobj.write(future.result())
+        self._pending = []
+        self._executor.shutdown()
+        self.fileobj.write(struct.pack("<II", self.crc & 0xFFFFFFFF, self.size & 0xFFFFFFFF))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def compress_to_tar_gz(
+    target_directory, file_list, output_tar_gz, threads=None, level=6, block_size=1 << 20
+):
+    """
+    Archive files of a directory into a tar.gz, in process, compressing on several threads.
+
+    The tar stream is produced by `tarfile` straight from the file list, without temporary files,
+    and compressed by `ParallelGzipWriter`. The throughput is logged.
+
+    Parameters:
+    - target_directory (str): The directory the archived paths are relative to.
+    - file_list (list of str): The files to archive, relative to `target_directory` or absolute inside it.
+    - output_tar_gz (str): The archive to create, it must not exist.
+    - threads (int, optional): The number of compression threads. Defaults to `os.cpu_count()`.
+    - level (int, optional): The zlib compression level. Defaults to 6.
+    - block_size (int, optional): The size of the blocks compressed independently. Defaults to 1 MiB.
+
+    Returns:
+    - dict: A dict with 'files', 'input_bytes' (tar size), 'output_bytes', 'elapsed' seconds and 'throughput' in bytes per second.
+
+    Raises:
+    - ValueError: If the directory or a file does not exist, a file is outside the directory, or the output exists.
+    """
     if not os.path.isdir(target_directory):
         raise ValueError(f"Target directory '{target_directory}' does not exist or is not a directory.")
     
     if os.path.exists(output_tar_gz):
         raise ValueError(f"Output file '{output_tar_gz}' already exists.")
 
-    temp_file_list = 'temp_files.txt'
-
-    temp_file_list = []
+    relative_paths = []
     for file in file_list:
         if not os.path.isabs(file):
             file = os.path.join(target_directory, file)
@@ -117,20 +1214,134 @@ def compress_to_tar_gz(target_directory, file_list, output_tar_gz):
             raise ValueError(f"File '{file}' is not within the target directory '{target_directory}'.")
 
         relative_path = os.path.relpath(file, start=target_directory)
-        temp_file_list.append(relative_path)
-    
-    with open(temp_file_list, 'w') as f:
-        for file in temp_file_list:
-            f.write(f"{file}\n")
+        relative_paths.append(relative_path)
 
+    start = time.time()
     try:
-        subprocess.run(['tar', '-czf', output_tar_gz, '-T', temp_file_list, '-C', target_directory], check=True)
-    finally:
-        os.remove(temp_file_list)
+        with open(output_tar_gz, "wb") as f:
+            with ParallelGzipWriter(
+                f, level=level, threads=threads, block_size=block_size
+            ) as gz:
+                with tarfile.open(fileobj=gz, mode="w|") as tar:
+                    for relative_path in relative_paths:
+                        tar.add(
+                            os.path.join(target_directory, relative_path),
+                            arcname=relative_path,
+                            recursive=False,
+                        )
+    except BaseException:
+        if os.path.exists(output_tar_gz):
+            os.remove(output_tar_gz)
+        raise
+    elapsed = time.time() - start
+
+    output_bytes = os.path.getsize(output_tar_gz)
+    throughput = gz.size / elapsed if elapsed > 0 else 0
+    logger.info(
+        f"compress {len(relative_paths)} files, {gz.size / 1e6:.1f} MB -> {output_bytes / 1e6:.1f} MB "
+        f"in {elapsed:.2f}s, {throughput / 1e6:.1f} MB/s"
+    )
 
     print(f"Compression successful: '{output_tar_gz}'")
+
+    return {
+        "files": len(relative_paths),
+        "input_bytes": gz.size,
+        "output_bytes": output_bytes,
+        "elapsed": elapsed,
+        "throughput": throughput,
+    }
     
-def extract_from_tar(tar_file, output_directory, file_patterns=None):
+def _tar_is_seekable(tar_file):
+    """
+    Whether `tar_file` is an uncompressed tar, whose members can be reached by seeking.
+    """
+    with open(tar_file, "rb") as f:
+        magic = f.read(6)
+    return not (
+        magic.startswith(b"\x1f\x8b")
+        or magic.startswith(b"BZh")
+        or magic.startswith(b"\xfd7zXZ\x00")
+    )
+
+
+def _tar_extract(tar, member, output_directory):
+    if hasattr(tarfile, "data_filter"):
+        tar.extract(member, output_directory, filter="data")
+    else:
+        tar.extract(member, output_directory)
+
+
+def index_tar(tar_file, index_file=None):
+    """
+    Build the member offset index of an uncompressed tar, cached as a json sidecar.
+
+    Only the headers are read, the member data is skipped by seeking. The sidecar records
+    the size and mtime of the archive and is rebuilt when they change. When it can not be
+    written, e.g. next to a read-only archive, a warning is logged and the index is only returned.
+
+    Parameters:
+    - tar_file (str): The uncompressed tar archive.
+    - index_file (str, optional): The sidecar path. Defaults to `tar_file + ".idx.json"`.
+
+    Returns:
+    - list: The `[name, offset]` pairs of the members in archive order, offset being the one of the member header.
+
+    Raises:
+    - ValueError: If the archive is compressed and thus not seekable.
+    """
+    if not _tar_is_seekable(tar_file):
+        raise ValueError(f"Tar file '{tar_file}' is compressed, it can not be indexed.")
+
+    if index_file is None:
+        index_file = tar_file + ".idx.json"
+
+    stat = os.stat(tar_file)
+    if os.path.isfile(index_file):
+        try:
+            index = load_json(index_file)
+            if index["size"] == stat.st_size and index["mtime_ns"] == stat.st_mtime_ns:
+                return index["members"]
+        except (ValueError, KeyError, TypeError):
+            pass
+
+    with tarfile.open(tar_file, "r:") as tar:
+        members = [[member.name, member.offset] for member in tar]
+
+    try:
+        dump_json(
+            {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "members": members},
+            index_file,
+        )
+    except OSError as e:
+        # e.g. a read-only archive directory, the index is still usable in memory
+        logger.warning(f"can not write the tar index '{index_file}': {e}")
+    return members
+
+
+def extract_from_tar(
+    tar_file, output_directory, file_patterns=None, use_index=True, index_file=None
+):
+    """
+    Extract the members of a tar archive matching patterns, in process.
+
+    Compressed archives are decompressed once and matched while streaming. Uncompressed
+    archives are extracted through the member offset index of `index_tar`, so only the
+    selected members are read.
+
+    Parameters:
+    - tar_file (str): The tar archive, optionally gzip, bzip2 or xz compressed.
+    - output_directory (str): The existing directory to extract to.
+    - file_patterns (list of str, optional): fnmatch patterns on member names. Defaults to all members.
+    - use_index (bool, optional): Whether to use and cache the offset index for uncompressed archives. Defaults to True.
+    - index_file (str, optional): The sidecar path of the index, see `index_tar`. Defaults to `tar_file + ".idx.json"`.
+
+    Returns:
+    - list: The names of the extracted members.
+
+    Raises:
+    - ValueError: If the archive or the output directory does not exist.
+    """
     if not os.path.isfile(tar_file):
         raise ValueError(f"Tar file '{tar_file}' does not exist or is not a file.")
 
@@ -140,24 +1351,29 @@ def extract_from_tar(tar_file, output_directory, file_patterns=None):
     if file_patterns is None:
         file_patterns = []
 
-    temp_file_list = 'temp_files.txt'
+    def match(name):
+        return not file_patterns or any(
+            fnmatch.fnmatch(name, pattern) for pattern in file_patterns
+        )
 
-    result = subprocess.run(['tar', '-tf', tar_file], capture_output=True, text=True, check=True)
-    all_files = result.stdout.splitlines()
-
-    if file_patterns:
-        matching_files = [file for file in all_files if any(fnmatch.fnmatch(file, pattern) for pattern in file_patterns)]
-        files_to_extract = matching_files
+    extracted = []
+    if use_index and _tar_is_seekable(tar_file):
+        members = index_tar(tar_file, index_file)
+        with tarfile.open(tar_file, "r:") as tar:
+            for name, offset in members:
+                if not match(name):
+                    continue
+                tar.fileobj.seek(offset)
+                member = tarfile.TarInfo.fromtarfile(tar)
+                _tar_extract(tar, member, output_directory)
+                extracted.append(name)
     else:
-        files_to_extract = all_files
-
-    with open(temp_file_list, 'w') as f:
-        for file in files_to_extract:
-            f.write(f"{file}\n")
+        with tarfile.open(tar_file, "r|*") as tar:
+            for member in tar:
+                if match(member.name):
+                    _tar_extract(tar, member, output_directory)
+                    extracted.append(member.name)
 
-    try:
-        subprocess.run(['tar', '-xvf', tar_file, '-T', temp_file_list, '-C', output_directory], check=True)
-    finally:
-        os.remove(temp_file_list)
+    print(f"Extraction successful to '{output_directory}'")
 
-    print(f"Extraction successful to '{output_directory}'")
\ No newline at end of file
+    return extracted
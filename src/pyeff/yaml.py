@@ -1,12 +1,155 @@
 import os
+import re
+import pickle
+import threading
+import contextvars
+import collections
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 import yaml
 import yaml_include
 
+from .fs import FileWatcher
+from .lines import dump_all_bytes, load_lines, dump_lines
+
+# prefer the libyaml C loaders / dumper, several times faster, fall back to pure Python
+try:
+    from yaml import CSafeLoader as _SafeLoader
+    from yaml import CFullLoader as _FullLoader
+    from yaml import CDumper as _Dumper
+
+    _YAML_BACKEND = "libyaml"
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
+    from yaml import FullLoader as _FullLoader
+    from yaml import Dumper as _Dumper
+
+    _YAML_BACKEND = "python"
+
+
+def yaml_backend():
+    """
+    Return the PyYAML backend used by this module.
+
+    Returns:
+        str: "libyaml" when PyYAML was built with the libyaml C extension, "python" otherwise.
+    """
+    return _YAML_BACKEND
+
+
+class _IncludeRecorder(object):
+    """
+    The include graph of one load, built by `_record_include` while parsing, with the signatures of its files.
+
+    `subtrees`, if given, maps included files to their already parsed (data, graph), which are
+    reused instead of parsing the file again; newly parsed included files are added to it.
+    """
+
+    def __init__(self, root, subtrees=None):
+        self.graph = {root: []}
+        self.stack = [root]
+        self.subtrees = subtrees
+        # the (size, mtime_ns) of every file, taken before it is read
+        self.signatures = _file_signatures([root])
+
+
+# the recorder of the load in progress in the current context, if any
+_include_recorder = contextvars.ContextVar("pyeff_yaml_include_recorder", default=None)
+
+# the include graph of the last `load_yaml_full` of each root file
+_include_graphs = {}
+_include_graphs_lock = threading.Lock()
+
+
+def _include_subgraph(graph, path):
+    """
+    The part of an include graph reachable from `path`.
+    """
+    subgraph = {}
+    stack = [path]
+    while stack:
+        node = stack.pop()
+        if node not in subgraph:
+            subgraph[node] = list(graph.get(node, []))
+            stack.extend(subgraph[node])
+    return subgraph
+
+
+def _record_include(path, file, loader_type):
+    """
+    The `custom_loader` of the include constructors, records the included file in the graph then parses it.
+    """
+    recorder = _include_recorder.get()
+    if recorder is None:
+        return yaml.load(file, loader_type)
+
+    path = os.path.abspath(path)
+    if path not in recorder.signatures:
+        recorder.signatures.update(_file_signatures([path]))
+    children = recorder.graph[recorder.stack[-1]]
+    if path not in children:
+        children.append(path)
+
+    if recorder.subtrees is not None and path in recorder.subtrees:
+        data, subgraph = recorder.subtrees[path]
+        for node, deps in subgraph.items():
+            recorder.graph.setdefault(node, list(deps))
+        return data
+
+    recorder.graph.setdefault(path, [])
+    recorder.stack.append(path)
+    try:
+        data = yaml.load(file, loader_type)
+    finally:
+        recorder.stack.pop()
+
+    if recorder.subtrees is not None:
+        recorder.subtrees[path] = (data, _include_subgraph(recorder.graph, path))
+    return data
+
+
+_full_loader_classes = {}
+_full_loader_classes_lock = threading.Lock()
+
+
+def _full_loader_class(base_path):
+    """
+    Return the full loader class resolving '!inc' / '!include' against `base_path`.
+
+    Each base directory gets its own subclass of the full loader, created once and cached, so the
+    constructors are never registered on the shared PyYAML classes and concurrent loads with
+    different base paths do not interfere.
+    """
+    base_path = os.path.abspath(base_path)
+    with _full_loader_classes_lock:
+        loader_class = _full_loader_classes.get(base_path)
+        if loader_class is None:
+            loader_class = type("IncludeFullLoader", (_FullLoader,), {})
+            constructor = yaml_include.Constructor(
+                base_dir=base_path, custom_loader=_record_include
+            )
+            loader_class.add_constructor("!inc", constructor)
+            loader_class.add_constructor("!include", constructor)
+            _full_loader_classes[base_path] = loader_class
+        return loader_class
+
+
+class _IgnoreIncludeSafeLoader(_SafeLoader):
+    """
+    The safe loader of `load_yaml_safe`, loading '!inc' / '!include' as None.
+    """
+
+
+_IgnoreIncludeSafeLoader.add_constructor("!include", lambda loader, node: None)
+_IgnoreIncludeSafeLoader.add_constructor("!inc", lambda loader, node: None)
+
 
 def load_yaml_full(yaml_file, base_path):
     """
     Load a YAML file, supporting the inclusion of other YAML files via the '!inc' or '!include' tags.
+
+    The libyaml `CFullLoader` is used when available, included files are parsed with the same loader.
+    The loader class is cached per `base_path`, concurrent loads from several threads are safe.
     
     Args:
         yaml_file (str): The path to the YAML file to be loaded.
@@ -20,12 +163,167 @@ def load_yaml_full(yaml_file, base_path):
     """
     assert os.path.exists(yaml_file)
 
-    yaml.add_constructor("!inc", yaml_include.Constructor(base_dir=base_path))
-    yaml.add_constructor("!include", yaml_include.Constructor(base_dir=base_path))
-    # yaml_include.add_to_loader_class(loader_class=yaml.FullLoader, base_dir=base_path)
+    return _load_yaml_full_graph(yaml_file, base_path)[0]
 
-    with open(yaml_file, "r", encoding="utf-8") as f:
-        return yaml.full_load(f)
+
+def _load_yaml_full_graph(yaml_file, base_path, subtrees=None):
+    """
+    Load a YAML file like `load_yaml_full`, recording its include graph.
+
+    Returns:
+        tuple: The data, the include graph mapping absolute file paths to the files they include, and
+               the (size, mtime_ns) of every file of the graph, taken before the file was read.
+    """
+    loader_class = _full_loader_class(base_path)
+
+    recorder = _IncludeRecorder(os.path.abspath(yaml_file), subtrees)
+    token = _include_recorder.set(recorder)
+    try:
+        with open(yaml_file, "r", encoding="utf-8") as f:
+            data = yaml.load(f, Loader=loader_class)
+    finally:
+        _include_recorder.reset(token)
+
+    with _include_graphs_lock:
+        _include_graphs[os.path.abspath(yaml_file)] = recorder.graph
+    return data, recorder.graph, recorder.signatures
+
+
+def get_include_graph(yaml_file):
+    """
+    Return the include graph recorded by the last `load_yaml_full` of a file.
+
+    Args:
+        yaml_file (str): The path to the loaded YAML file.
+
+    Returns:
+        dict: The absolute paths of the root file and of every file it includes, transitively, mapped to
+              the list of files they include directly. None if the file was not loaded.
+    """
+    with _include_graphs_lock:
+        graph = _include_graphs.get(os.path.abspath(yaml_file))
+    if graph is None:
+        return None
+    return {path: list(deps) for path, deps in graph.items()}
+
+
+_yaml_cache = collections.OrderedDict()
+_yaml_cache_lock = threading.Lock()
+_yaml_cache_size = 128
+
+
+def _file_signatures(files):
+    """
+    Map each file to its (size, mtime_ns), None for a missing file.
+    """
+    signatures = {}
+    for file in files:
+        try:
+            st = os.stat(file)
+            signatures[file] = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            signatures[file] = None
+    return signatures
+
+
+def load_yaml_cached(yaml_file, base_path=None, snapshot=None):
+    """
+    Load a YAML file like `load_yaml_full`, from a cache while neither it nor any file it includes changed.
+
+    The files pulled in by '!inc' / '!include', recursively, are recorded during the parse, and the entry is
+    valid as long as the size and mtime of the root file and of every included file are unchanged. Entries are
+    kept in an in-memory LRU of `yaml_cache_size()` entries. With `snapshot`, the entry is also pickled to that
+    file, so a new process starts from it instead of parsing. Note that a file newly matching a wildcard
+    include does not invalidate the entry.
+
+    The returned object is shared between the calls hitting the cache, it must not be modified.
+
+    Args:
+        yaml_file (str): The path to the YAML file to be loaded.
+        base_path (str, optional): The base directory of the includes. Defaults to the directory of `yaml_file`.
+        snapshot (str, optional): The path of an on-disk pickle snapshot of the entry. Defaults to None.
+
+    Returns:
+        object: The data structure loaded from the YAML file.
+
+    Raises:
+        AssertionError: If the specified yaml_file does not exist.
+    """
+    assert os.path.exists(yaml_file)
+
+    yaml_file = os.path.abspath(yaml_file)
+    if base_path is None:
+        base_path = os.path.dirname(yaml_file)
+    key = (yaml_file, os.path.abspath(base_path))
+
+    with _yaml_cache_lock:
+        entry = _yaml_cache.get(key)
+    if entry is not None and _file_signatures(entry[0]) == entry[0]:
+        with _yaml_cache_lock:
+            if key in _yaml_cache:
+                _yaml_cache.move_to_end(key)
+        return entry[1]
+
+    entry = None
+    if snapshot is not None and os.path.isfile(snapshot):
+        try:
+            with open(snapshot, "rb") as f:
+                saved = pickle.load(f)
+            if saved["key"] == key and _file_signatures(saved["files"]) == saved["files"]:
+                entry = (saved["files"], saved["data"])
+        except Exception:
+            entry = None
+
+    if entry is None:
+        # the signature of each file is taken before it is read, a file changing meanwhile invalidates the entry
+        data, graph, signatures = _load_yaml_full_graph(yaml_file, base_path)
+        entry = (signatures, data)
+
+        if snapshot is not None:
+            dump_all_bytes(
+                pickle.dumps(
+                    {"key": key, "files": signatures, "data": data},
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                ),
+                snapshot,
+                atomic=True,
+            )
+
+    with _yaml_cache_lock:
+        _yaml_cache[key] = entry
+        _yaml_cache.move_to_end(key)
+        while len(_yaml_cache) > _yaml_cache_size:
+            _yaml_cache.popitem(last=False)
+
+    return entry[1]
+
+
+def yaml_cache_size(size=None):
+    """
+    Get, or set, the number of entries kept in memory by `load_yaml_cached`.
+
+    Args:
+        size (int, optional): The new size. Defaults to None, only getting it.
+
+    Returns:
+        int: The size.
+    """
+    global _yaml_cache_size
+    if size is not None:
+        assert size >= 0
+        with _yaml_cache_lock:
+            _yaml_cache_size = size
+            while len(_yaml_cache) > _yaml_cache_size:
+                _yaml_cache.popitem(last=False)
+    return _yaml_cache_size
+
+
+def yaml_cache_clear():
+    """
+    Drop all the in-memory entries of `load_yaml_cached`. Snapshot files are kept.
+    """
+    with _yaml_cache_lock:
+        _yaml_cache.clear()
 
 
 def load_yaml_safe(yaml_file):
@@ -33,9 +331,9 @@ def load_yaml_safe(yaml_file):
     Safely loads a YAML file, ensuring its existence and handles custom constructors for 'include' directives.
     
     This function performs a safety check by asserting the existence of the specified YAML file.
-    It then adds custom constructors to the YAML SafeLoader to handle pseudotags like '!include' or '!inc',
+    It loads the file with a subclass of the YAML SafeLoader that handles pseudotags like '!include' or '!inc',
     although they are currently implemented to do nothing (practically ignoring these tags).
-    Finally, it opens the file and loads its content using the modified SafeLoader.
+    The global SafeLoader is left untouched. The libyaml `CSafeLoader` is used when available (see `yaml_backend`).
     
     Parameters:
     - yaml_file (str): The path to the YAML file to be loaded.
@@ -48,11 +346,134 @@ def load_yaml_safe(yaml_file):
     """
     assert os.path.exists(yaml_file)
 
-    yaml.add_constructor("!include", lambda loader, node: None, Loader=yaml.SafeLoader)
-    yaml.add_constructor("!inc", lambda loader, node: None, Loader=yaml.SafeLoader)
-
     with open(yaml_file, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=_IgnoreIncludeSafeLoader)
+
+
+class YamlWatcher(object):
+    """
+    Keep a YAML file loaded like `load_yaml_full`, reloading it when it or any file it includes changes.
+
+    The parsed data of every included file is kept with its include subgraph. On a change, only the changed
+    files and the files including them, up to the root, are parsed again, the other subtrees are reused
+    as they are, so a reload costs about the size of the changed files. The files are watched with
+    `pyeff.fs.FileWatcher`, files newly included are watched from the reload on.
+
+    The data is shared with the subtree cache, it must not be modified.
+
+    Example:
+        with YamlWatcher("./config/app.yml") as watcher:
+            while True:
+                if watcher.poll(timeout=10):
+                    apply(watcher.data)
+    """
+
+    def __init__(self, yaml_file, base_path=None, poll_interval=0.5):
+        assert os.path.exists(yaml_file)
+
+        self.yaml_file = os.path.abspath(yaml_file)
+        self.base_path = base_path if base_path is not None else os.path.dirname(self.yaml_file)
+        self._subtrees = {}
+        self.data, self.graph, _ = _load_yaml_full_graph(
+            self.yaml_file, self.base_path, self._subtrees
+        )
+        self._watcher = FileWatcher(self.graph, poll_interval=poll_interval)
+
+    def poll(self, timeout=0):
+        """
+        Reload the file if it or one of its includes changed.
+
+        :param timeout: The maximum number of seconds to wait for a change, 0 to only check, None to wait forever.
+        :return: The set of changed files, empty if nothing changed and the data was not reloaded.
+        """
+        if timeout == 0:
+            changed = self._watcher.changes()
+        else:
+            changed = self._watcher.wait(timeout)
+        changed &= set(self.graph)
+        if not changed:
+            return changed
+
+        parents = collections.defaultdict(list)
+        for path, deps in self.graph.items():
+            for dep in deps:
+                parents[dep].append(path)
+
+        stale = set()
+        stack = list(changed)
+        while stack:
+            path = stack.pop()
+            if path not in stale:
+                stale.add(path)
+                stack.extend(parents[path])
+        for path in stale:
+            self._subtrees.pop(path, None)
+
+        self.data, self.graph, _ = _load_yaml_full_graph(
+            self.yaml_file, self.base_path, self._subtrees
+        )
+        for path in set(self._subtrees) - set(self.graph):
+            del self._subtrees[path]
+        for path in set(self.graph) - self._watcher.paths:
+            self._watcher.add(path)
+
+        return changed
+
+    def close(self):
+        """
+        Stop watching the files.
+        """
+        self._watcher.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _load_one(yaml_file, base_path, safe):
+    if safe:
+        return load_yaml_safe(yaml_file)
+    if base_path is None:
+        base_path = os.path.dirname(os.path.abspath(yaml_file))
+    return load_yaml_full(yaml_file, base_path)
+
+
+def load_many(yaml_files, base_path=None, safe=False, max_workers=None, processes=False):
+    """
+    Load a batch of YAML files concurrently.
+
+    Files are loaded with `load_yaml_full`, or `load_yaml_safe` if `safe`, on a thread pool. As parsing holds the GIL,
+    `processes=True` uses a process pool instead, which scales with the CPUs at the cost of pickling the results back.
+
+    Args:
+        yaml_files (list of str): The paths to the YAML files to be loaded.
+        base_path (str, optional): The base directory of the includes. Defaults to the directory of each file.
+        safe (bool, optional): If True, load with `load_yaml_safe`, ignoring includes. Defaults to False.
+        max_workers (int, optional): The number of workers. Defaults to the executor default.
+        processes (bool, optional): If True, use a process pool instead of a thread pool. Defaults to False.
+
+    Returns:
+        list: The loaded data, in the order of `yaml_files`.
+
+    Raises:
+        AssertionError: If one of the files does not exist.
+    """
+    yaml_files = list(yaml_files)
+    for yaml_file in yaml_files:
+        assert os.path.exists(yaml_file)
+
+    executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor_class(max_workers=max_workers) as executor:
+        return list(
+            executor.map(
+                _load_one,
+                yaml_files,
+                [base_path] * len(yaml_files),
+                [safe] * len(yaml_files),
+            )
+        )
 
 
 def dump_yaml(obj, yaml_file):
@@ -66,27 +487,189 @@ def dump_yaml(obj, yaml_file):
     This function opens the specified file in write mode ('w') with UTF-8 encoding,
     and uses yaml.dump to serialize 'obj' into YAML format, ensuring that the output
     keys are not sorted alphabetically by setting 'sort_keys' to False.
+    The libyaml `CDumper` is used when available.
     """
     with open(yaml_file, "w", encoding="utf-8") as f:
-        yaml.dump(obj, f, sort_keys=False)
+        yaml.dump(obj, f, Dumper=_Dumper, sort_keys=False)
+
+
+def iter_yaml_documents(yaml_file, base_path=None, safe=True):
+    """
+    Iterate the documents of a multi-document YAML stream, parsing one document at a time.
+
+    The file is read incrementally by the parser, the libyaml C one when available, so the memory used is
+    proportional to one document rather than to the whole file.
+
+    Args:
+        yaml_file (str): The path to the YAML stream.
+        base_path (str, optional): The base directory of the includes, when not `safe`. Defaults to the directory of `yaml_file`.
+        safe (bool, optional): If True, parse like `load_yaml_safe`, else like `load_yaml_full`. Defaults to True.
+
+    Yields:
+        object: The documents, in order.
+
+    Raises:
+        AssertionError: If the specified yaml_file does not exist.
+    """
+    assert os.path.exists(yaml_file)
+
+    if safe:
+        loader_class = _IgnoreIncludeSafeLoader
+    else:
+        if base_path is None:
+            base_path = os.path.dirname(os.path.abspath(yaml_file))
+        loader_class = _full_loader_class(base_path)
+
+    with open(yaml_file, "r", encoding="utf-8") as f:
+        yield from yaml.load_all(f, Loader=loader_class)
+
+
+def dump_yaml_stream(documents, yaml_file):
+    """
+    Writes documents to a multi-document YAML stream, emitting them one at a time.
+
+    `documents` may be a generator, each document is serialized and written before the next one is
+    taken, like `dump_yaml` does for a single object.
+
+    Args:
+        documents (iterable): The Python objects to be serialized, one document each.
+        yaml_file (str): The file path where the YAML stream will be saved.
+
+    Returns:
+        int: The number of documents written.
+    """
+    count = 0
+
+    def counted():
+        nonlocal count
+        for document in documents:
+            count += 1
+            yield document
+
+    with open(yaml_file, "w", encoding="utf-8") as f:
+        yaml.dump_all(counted(), f, Dumper=_Dumper, sort_keys=False)
+
+    return count
+
+
+# a top-level mapping key: a quoted or plain scalar at column 0 followed by ':' and a space or the line end
+_TOP_KEY = re.compile(
+    r"""^(?!-[ \t\r\n]|---|\.\.\.)"""
+    r"""(?:"((?:[^"\\]|\\.)*)"|'((?:[^']|'')*)'|([^\s#'"][^#]*?))[ \t]*:(?:[ \t]|\r?\n|$)"""
+)
+
+
+def _top_key_spans(yaml_lines):
+    """
+    Find the line span [begin, end) of every top-level key, in one scan.
+
+    A span starts at the key line and goes on over the indented lines and the block sequence
+    items at column 0 up to the next top-level key, comments at column 0 included when more of the
+    value follows them. Trailing blank and comment lines are excluded, document markers end it.
+
+    Returns:
+        list: (key, begin, end) tuples, in file order, repeated keys included.
+    """
+    spans = []
+    current = None
+    for index, line in enumerate(yaml_lines):
+        if not line.strip() or line[0] == "#":
+            continue
+        if line[0] in " \t" or (line[0] == "-" and line[1:2] in ("", " ", "\t", "\r", "\n")):
+            if current is not None:
+                current[2] = index + 1
+            continue
+
+        if current is not None:
+            spans.append(tuple(current))
+            current = None
+
+        m = _TOP_KEY.match(line)
+        if m is not None:
+            if m.group(1) is not None:
+                key = yaml.load(f'"{m.group(1)}"', Loader=_SafeLoader)
+            elif m.group(2) is not None:
+                key = m.group(2).replace("''", "'")
+            else:
+                key = m.group(3)
+            current = [key, index, index + 1]
+
+    if current is not None:
+        spans.append(tuple(current))
+    return spans
+
+
+def _top_key_lines(key, value, raw):
+    if raw:
+        return [f"{key}: {value}\n"]
+    text = yaml.dump(
+        {key: value}, Dumper=_Dumper, sort_keys=False, allow_unicode=True, default_flow_style=False
+    )
+    return text.splitlines(keepends=True)
+
+
+def patch_yaml_top_keys(yaml_file, overrides, raw=False):
+    """
+    Replace or append several key-value pairs at the top level of a YAML file, in one atomic write.
+
+    The file is scanned once for the line span of every top-level key. The first span of an overridden key is
+    replaced, its repeated spans are removed, and the keys not found are appended at the end. All the other
+    lines, comments included, are kept unchanged.
+
+    :param yaml_file: Path to the YAML file to be modified.
+    :param overrides: A dict of the top-level keys and their new values.
+    :param raw: If True, values are written verbatim as `key: value`, else they are serialized as YAML. Defaults to False.
+    :return: A dict mapping each key of `overrides` to "replaced" or "appended".
+    """
+    assert os.path.exists(yaml_file)
+
+    yaml_lines = load_lines(yaml_file, encoding="utf-8")
+
+    first = {}
+    removed = set()
+    for key, begin, end in _top_key_spans(yaml_lines):
+        if key not in overrides:
+            continue
+        if key in first:
+            removed.update(range(begin, end))
+        else:
+            first[key] = (begin, end)
+            removed.update(range(begin + 1, end))
+
+    replace_at = {begin: key for key, (begin, end) in first.items()}
+    patched = []
+    for index, line in enumerate(yaml_lines):
+        if index in replace_at:
+            key = replace_at[index]
+            patched.extend(_top_key_lines(key, overrides[key], raw))
+        elif index not in removed:
+            patched.append(line)
+
+    result = {}
+    for key, value in overrides.items():
+        if key in first:
+            result[key] = "replaced"
+            continue
+        if patched and not patched[-1].endswith("\n"):
+            patched[-1] += "\n"
+        patched.extend(_top_key_lines(key, value, raw))
+        result[key] = "appended"
+
+    dump_lines(patched, yaml_file, encoding="utf-8", atomic=True)
+
+    return result
 
 
 def override_yaml_top_key(yaml_file, key, value):
     """
     Append or update a key-value pair at the top level of a YAML file.
     
-    This function reads a YAML file, detects its content, and then adds or overrides
-    the specified key with the given value at the beginning of the file,
-    ensuring the file's original content remains intact.
+    This function replaces the existing top-level `key` in place, dropping its duplicates,
+    or appends it at the end of the file, keeping the rest of the content intact.
+    The value is written verbatim, see `patch_yaml_top_keys` to apply several overrides at once.
 
     :param yaml_file: Path to the YAML file to be modified.
     :param key: The key to be added or whose value is to be updated.
     :param value: The value associated with the key.
     """
-    with open(yaml_file, "r", encoding="utf-8") as f:
-        yaml_lines = f.readlines()
-
-    yaml_lines.append("".join(["\n", f"{key}: {value}", "\n"]))
-
-    with open(yaml_file, "w", encoding="utf-8") as f:
-        f.writelines(yaml_lines)
+    patch_yaml_top_keys(yaml_file, {key: value}, raw=True)
@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pyeff.json import load_json, dump_json, load_jsonl, dump_jsonl
+from pyeff.json import _JSON_BACKENDS
+
+
+def payloads():
+    random.seed(0)
+    yield "records", [
+        {
+            "id": i,
+            "name": f"user-{i}",
+            "email": f"user{i}@example.com",
+            "active": i % 3 == 0,
+            "score": random.random() * 100,
+            "tags": ["a", "b", "c"][: i % 4],
+        }
+        for i in range(200000)
+    ]
+    yield "numbers", [[random.random() for _ in range(100)] for _ in range(10000)]
+    yield "unicode", {f"键{i}": "中文字符串 / ünïcödé " * 10 for i in range(50000)}
+    yield "nested", {
+        "config": {f"section{i}": {"values": list(range(50)), "meta": {"k": "v"}} for i in range(5000)}
+    }
+
+
+def bench(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    # compare the installed json backends of pyeff.json on representative payloads
+    backends = [name for name, module in _JSON_BACKENDS.items() if module is not None]
+    print(f"{'payload':<10} {'backend':<8} {'size(MB)':>9} {'dump(s)':>9} {'load(s)':>9} {'jsonl dump(s)':>14} {'jsonl load(s)':>14}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_file = os.path.join(tmp, "payload.json")
+        jsonl_file = os.path.join(tmp, "payload.jsonl")
+        for name, obj in payloads():
+            records = obj if isinstance(obj, list) else list(obj.items())
+            for backend in backends:
+                dump = bench(lambda: dump_json(obj, json_file, backend=backend))
+                load = bench(lambda: load_json(json_file, backend=backend))
+                size = os.path.getsize(json_file) / 1e6
+                jsonl_dump = bench(lambda: dump_jsonl(records, jsonl_file, backend=backend))
+                jsonl_load = bench(lambda: load_jsonl(jsonl_file, backend=backend))
+                print(
+                    f"{name:<10} {backend:<8} {size:>9.1f} {dump:>9.3f} {load:>9.3f} "
+                    f"{jsonl_dump:>14.3f} {jsonl_load:>14.3f}"
+                )
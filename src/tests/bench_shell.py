@@ -0,0 +1,31 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from loguru import logger
+
+from pyeff.shell import run_cmds
+
+
+def bench(name, cmds, cwd=None, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run_cmds(cmds, cwd=cwd)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:<24} {len(cmds):>6} cmds {best:>8.3f}s {best / len(cmds) * 1e6:>9.1f} us/cmd")
+
+
+if __name__ == "__main__":
+    # per command overhead of a fan-out of short processes: shell strings vs argv lists
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    logger.remove()
+
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    bench("shell", ["/bin/true"] * n)
+    bench("argv", [["/bin/true"]] * n)
+    bench("shell, cwd", ["/bin/true"] * n, cwd=cwd)
+    bench("argv, cwd", [["/bin/true"]] * n, cwd=cwd)
@@ -1,8 +1,22 @@
+import io
 import os
+import sys
+import json
+import time
+import threading
+import asyncio
+import datetime
 
 from pyeff.fs import copy, remove, move
-from pyeff.yaml import load_yaml_full, load_yaml_safe, dump_yaml
+from pyeff.yaml import load_yaml_full, load_yaml_safe, dump_yaml, yaml_backend
+from pyeff.yaml import load_yaml_cached, yaml_cache_clear, load_many
+from pyeff.yaml import iter_yaml_documents, dump_yaml_stream
+from pyeff.yaml import patch_yaml_top_keys, override_yaml_top_key
+from pyeff.yaml import get_include_graph, YamlWatcher
 from pyeff.json import load_json, dump_json
+from pyeff.json import iter_json_array
+from pyeff.json import iter_jsonl, load_jsonl, dump_jsonl
+from pyeff.json import json_backend, set_json_backend
 from pyeff.logger import (
     logger_file_info,
     logger_section,
@@ -10,7 +24,18 @@ from pyeff.logger import (
     logger_table_end,
 )
 from pyeff.fs import current_dir
-from pyeff.shell import run_cmds
+from pyeff.shell import run_cmds, run_cmds_graph, arun_cmds, run_cmd_capture
+from pyeff.shell import CmdCache, run_cmd_cached, ShellSession
+from pyeff.shell import profile_cmds, log_usage_table
+from pyeff.shell import compress_to_tar_gz, ParallelGzipWriter
+from pyeff.shell import extract_from_tar, index_tar
+from pyeff.lines import load_lines, dump_lines, EditSession, edit_files
+from pyeff.lines import find_in_file, grep_file
+from pyeff.lines import load_all_text, dump_all_text, load_all_bytes, dump_all_bytes
+from pyeff.lines import follow, afollow
+from pyeff.lines import diff, diff_hunks, diff_opcodes
+from pyeff.lines import scan
+from pyeff.lines import chunk_ranges, map_chunks, count_lines
 
 
 def test_clear():
@@ -159,6 +184,191 @@ def test_yaml():
     assert y["file1"] == None
     assert y["file2"] == None
 
+    assert yaml_backend() in ("libyaml", "python")
+
+
+def test_yaml_cached():
+    logger_section("start test_yaml_cached")
+
+    remove("../../build/yaml_cached")
+    copy("./data_2/yaml", "../../build/yaml_cached")
+    root = "../../build/yaml_cached/0.yml"
+    snapshot = "../../build/yaml_cached/0.pickle"
+
+    y = load_yaml_cached(root, snapshot=snapshot)
+    assert y["file1"]["name"] == "1"
+    assert load_yaml_cached(root, snapshot=snapshot) is y
+    assert os.path.isfile(snapshot)
+
+    # a change of an included file invalidates the entry
+    dump_all_text('name: "one"\n', "../../build/yaml_cached/include.d/1.yml")
+    y = load_yaml_cached(root, snapshot=snapshot)
+    assert y["file1"]["name"] == "one"
+    assert y["file2"]["name"] == "2"
+
+    # a cold start is served by the snapshot
+    yaml_cache_clear()
+    assert load_yaml_cached(root, snapshot=snapshot) == y
+
+    # an include changing right after it was read is reloaded on the next call
+    import pyeff.yaml
+
+    real_yaml = pyeff.yaml.yaml
+
+    class ChangingYaml(object):
+        changed = False
+
+        def __getattr__(self, name):
+            return getattr(real_yaml, name)
+
+        def load(self, stream, Loader):
+            data = real_yaml.load(stream, Loader)
+            if not ChangingYaml.changed:
+                ChangingYaml.changed = True
+                dump_all_text('name: "uno dos"\n', "../../build/yaml_cached/include.d/1.yml")
+            return data
+
+    yaml_cache_clear()
+    pyeff.yaml.yaml = ChangingYaml()
+    try:
+        assert load_yaml_cached(root)["file1"]["name"] == "one"
+    finally:
+        pyeff.yaml.yaml = real_yaml
+    assert load_yaml_cached(root)["file1"]["name"] == "uno dos"
+
+
+def test_yaml_many():
+    logger_section("start test_yaml_many")
+
+    # the same include name resolves against the base path of each file
+    remove("../../build/yaml_many")
+    files = []
+    for i in range(4):
+        os.makedirs(f"../../build/yaml_many/{i}")
+        dump_all_text(f"name: '{i}'\n", f"../../build/yaml_many/{i}/inc.yml")
+        dump_all_text("inc: !inc inc.yml\n", f"../../build/yaml_many/{i}/root.yml")
+        files.append(f"../../build/yaml_many/{i}/root.yml")
+
+    files = files * 8
+    expected = [{"inc": {"name": f.split("/")[-2]}} for f in files]
+    assert load_many(files, max_workers=8) == expected
+    assert load_many(files[:4], processes=True, max_workers=2) == expected[:4]
+    assert load_many(files[:4], safe=True) == [{"inc": None}] * 4
+
+
+def test_yaml_stream():
+    logger_section("start test_yaml_stream")
+
+    events = ({"id": i, "tags": ["a", "b"], "payload": {"x": i * 1.5}} for i in range(1000))
+    assert dump_yaml_stream(events, "../../build/events.yml") == 1000
+
+    documents = iter_yaml_documents("../../build/events.yml")
+    assert next(documents) == {"id": 0, "tags": ["a", "b"], "payload": {"x": 0.0}}
+    assert [d["id"] for d in documents] == list(range(1, 1000))
+
+    dump_all_text("a: !inc include.d/1.yml\n---\nb: 2\n", "../../build/stream.yml")
+    assert list(iter_yaml_documents("../../build/stream.yml")) == [{"a": None}, {"b": 2}]
+    documents = iter_yaml_documents("../../build/stream.yml", "./data_2/yaml", safe=False)
+    assert list(documents) == [{"a": {"name": "1"}}, {"b": 2}]
+
+
+def test_yaml_patch():
+    logger_section("start test_yaml_patch")
+
+    text = (
+        "# header comment\n"
+        "name: old\n"
+        "list:\n"
+        "- 1\n"
+        "- 2\n"
+        "\n"
+        "nested:\n"
+        "  a: 1\n"
+        "  # inner comment\n"
+        "  b: 2\n"
+        "\n"
+        "# keep me\n"
+        '"quoted key": x\n'
+        "name: duplicate\n"
+        "tail: true"
+    )
+    dump_all_text(text, "../../build/patch.yml")
+
+    result = patch_yaml_top_keys(
+        "../../build/patch.yml",
+        {"list": [3], "nested": {"c": 3}, "quoted key": "y", "name": "new", "added": 1},
+    )
+    assert result == {
+        "list": "replaced",
+        "nested": "replaced",
+        "quoted key": "replaced",
+        "name": "replaced",
+        "added": "appended",
+    }
+    patched = load_all_text("../../build/patch.yml")
+    assert patched.startswith("# header comment\nname: new\nlist:\n- 3\n\nnested:\n  c: 3\n\n# keep me\n")
+    assert patched.count("name:") == 1
+    assert load_yaml_safe("../../build/patch.yml") == {
+        "name": "new",
+        "list": [3],
+        "nested": {"c": 3},
+        "quoted key": "y",
+        "tail": True,
+        "added": 1,
+    }
+
+    override_yaml_top_key("../../build/patch.yml", "tail", "false")
+    override_yaml_top_key("../../build/patch.yml", "more", "[1, 2]")
+    y = load_yaml_safe("../../build/patch.yml")
+    assert y["tail"] is False
+    assert y["more"] == [1, 2]
+
+    # a comment at column 0 inside a block does not end the span of its key
+    dump_all_text("list:\n# c\n- 1\n- 2\n# before b\nb: 1\n", "../../build/patch.yml")
+    patch_yaml_top_keys("../../build/patch.yml", {"list": [9]})
+    assert load_all_text("../../build/patch.yml") == "list:\n- 9\n# before b\nb: 1\n"
+    assert load_yaml_safe("../../build/patch.yml") == {"list": [9], "b": 1}
+
+
+def test_yaml_watch():
+    logger_section("start test_yaml_watch")
+
+    remove("../../build/yaml_watch")
+    os.makedirs("../../build/yaml_watch")
+    dump_all_text("a: !inc a.yml\nc: !inc c.yml\n", "../../build/yaml_watch/root.yml")
+    dump_all_text("b: !inc b.yml\n", "../../build/yaml_watch/a.yml")
+    dump_all_text("value: 1\n", "../../build/yaml_watch/b.yml")
+    dump_all_text("value: 3\n", "../../build/yaml_watch/c.yml")
+
+    load_yaml_full("../../build/yaml_watch/root.yml", "../../build/yaml_watch")
+    d = os.path.abspath("../../build/yaml_watch")
+    assert get_include_graph("../../build/yaml_watch/root.yml") == {
+        f"{d}/root.yml": [f"{d}/a.yml", f"{d}/c.yml"],
+        f"{d}/a.yml": [f"{d}/b.yml"],
+        f"{d}/b.yml": [],
+        f"{d}/c.yml": [],
+    }
+
+    with YamlWatcher("../../build/yaml_watch/root.yml", poll_interval=0.05) as watcher:
+        assert watcher.data == {"a": {"b": {"value": 1}}, "c": {"value": 3}}
+        assert watcher.poll() == set()
+        c = watcher.data["c"]
+
+        dump_all_text("value: 2\n", "../../build/yaml_watch/b.yml")
+        assert watcher.poll(timeout=5) == {f"{d}/b.yml"}
+        assert watcher.data == {"a": {"b": {"value": 2}}, "c": {"value": 3}}
+        # the unchanged subtree is reused, not parsed again
+        assert watcher.data["c"] is c
+
+        dump_all_text("value: 4\nd: !inc d.yml\n", "../../build/yaml_watch/c.yml")
+        dump_all_text("value: 5\n", "../../build/yaml_watch/d.yml")
+        watcher.poll(timeout=5)
+        assert watcher.data["c"] == {"value": 4, "d": {"value": 5}}
+
+        dump_all_text("value: 6\n", "../../build/yaml_watch/d.yml")
+        assert watcher.poll(timeout=5) == {f"{d}/d.yml"}
+        assert watcher.data["c"]["d"] == {"value": 6}
+
 
 def test_json():
     logger_section("start test_json")
@@ -171,6 +381,113 @@ def test_json():
     assert j1["key"] == j2["key"]
 
 
+def test_json_array():
+    logger_section("start test_json_array")
+
+    doc = {
+        "meta": {"skip": [{"a": 'x]}\\"{['}] * 100, "n": 1.5},
+        "data": [{"rows": [{"id": i, "v": [i, {"t": "é" + str(i)}]} for i in range(1000)]}],
+        "tail": [1, 2],
+    }
+    dump_json(doc, "../../build/array.json")
+
+    for chunk_size in [1, 7, 1 << 20]:
+        rows = iter_json_array("../../build/array.json", ["data", 0, "rows"], chunk_size)
+        assert list(rows) == doc["data"][0]["rows"]
+        assert list(iter_json_array("../../build/array.json", "tail", chunk_size)) == [1, 2]
+
+    # numbers cut by a chunk boundary, in the array and in the skipped values
+    dump_all_text('{"n":1.5,"e":-2E+3,"a":[1.5,2.25,1e5,-3,10.125,0,-0.5e-2]}', "../../build/array_num.json")
+    for chunk_size in range(1, 8):
+        nums = list(iter_json_array("../../build/array_num.json", "a", chunk_size))
+        assert nums == [1.5, 2.25, 1e5, -3, 10.125, 0, -0.5e-2]
+        assert [type(x) for x in nums[2:4]] == [float, int]
+
+    dump_json(list(range(100)), "../../build/array_top.json")
+    assert list(iter_json_array("../../build/array_top.json")) == list(range(100))
+
+    for prefix, error in [("missing", KeyError), ("meta.n", ValueError)]:
+        try:
+            list(iter_json_array("../../build/array.json", prefix))
+            assert False
+        except error:
+            pass
+
+
+def test_jsonl():
+    logger_section("start test_jsonl")
+
+    records = [{"id": i, "name": f"名字{i}", "tags": ["a"] * (i % 3)} for i in range(5000)]
+    assert dump_jsonl(iter(records), "../../build/records.jsonl") == 5000
+    assert load_all_text("../../build/records.jsonl", encoding="utf-8").startswith(
+        '{"id":0,"name":"名字0","tags":[]}\n'
+    )
+
+    assert list(iter_jsonl("../../build/records.jsonl")) == records
+    assert load_jsonl("../../build/records.jsonl") == records
+    assert load_jsonl("../../build/records.jsonl", parallel=True, workers=3, chunk_size=4096) == records
+
+    dump_all_text('{"a": 1}\n\n{"a": \n', "../../build/bad.jsonl")
+    try:
+        list(iter_jsonl("../../build/bad.jsonl"))
+        assert False
+    except ValueError as e:
+        assert "bad.jsonl:3:" in str(e)
+
+
+def test_json_backend():
+    logger_section("start test_json_backend")
+
+    obj = {"name": "名字 / x", "list": [1, 2.5, True, None, {}], "nested": {"a": []}, "big": 1 << 70}
+    default = json_backend()
+    try:
+        for backend in ["orjson", "ujson", "json"]:
+            try:
+                set_json_backend(backend)
+            except ValueError:
+                continue
+            dump_json(obj, "../../build/backend.json")
+            text = load_all_text("../../build/backend.json", encoding="utf-8")
+            assert '"name": "名字 / x"' in text
+            assert text.startswith('{\n  "name"')
+            assert load_json("../../build/backend.json") == obj
+
+            dump_jsonl([obj], "../../build/backend.jsonl")
+            assert load_jsonl("../../build/backend.jsonl") == [obj]
+
+            # the output and the errors are the ones of the stdlib
+            special = {"nan": float("nan"), "inf": float("inf"), "small": 1e-7, "large": 1e20}
+            dump_json(special, "../../build/special.json")
+            assert load_all_text("../../build/special.json", encoding="utf-8") == json.dumps(
+                special, indent=2, ensure_ascii=False
+            )
+            try:
+                dump_json({"date": datetime.date(2020, 1, 1)}, "../../build/date.json")
+                assert False
+            except TypeError:
+                pass
+
+            # integers beyond 64 bits, which a float does not hold exactly
+            huge = {"id": 123456789012345678901234567890, "neg": -9999999999999999999}
+            dump_json(huge, "../../build/huge.json")
+            assert load_json("../../build/huge.json") == huge
+            dump_jsonl([huge], "../../build/huge.jsonl")
+            assert load_jsonl("../../build/huge.jsonl") == [huge]
+            assert load_jsonl("../../build/huge.jsonl", parallel=True, workers=1) == [huge]
+    finally:
+        set_json_backend(default)
+
+    dump_all_text('{"a": NaN}', "../../build/nan.json")
+    assert str(load_json("../../build/nan.json")["a"]) == "nan"
+    assert load_json("../../build/backend.json", backend="json") == obj
+
+    try:
+        set_json_backend("simdjson")
+        assert False
+    except ValueError:
+        pass
+
+
 def test_logger():
     logger_section("start test_logger")
 
@@ -189,11 +506,568 @@ def test_shell():
     )
 
 
+def test_lines_edit():
+    logger_section("start test_lines_edit")
+
+    os.makedirs("../../build", exist_ok=True)
+    dump_lines(["a", "b", "c", "b"], "../../build/edit_1.txt", append_new_lines=True)
+    dump_lines(["x", "y"], "../../build/edit_2.txt", append_new_lines=True)
+
+    s1 = EditSession("../../build/edit_1.txt")
+    s1.insert(["head"], index=0, append_new_line=True, insert_before=True)
+    s1.replace(["B"], pattern="^b", append_new_line=True)
+    s1.delete(pattern="^c")
+    s2 = EditSession("../../build/edit_2.txt").delete(pattern="^z")
+
+    assert edit_files([s1, s2], max_workers=2) == [True, False]
+    assert load_lines("../../build/edit_1.txt", remove_new_line=True) == [
+        "head",
+        "a",
+        "B",
+        "B",
+    ]
+    assert load_lines("../../build/edit_2.txt", remove_new_line=True) == ["x", "y"]
+
+
+def test_lines_grep():
+    logger_section("start test_lines_grep")
+
+    os.makedirs("../../build", exist_ok=True)
+    dump_lines(
+        ["info start", "error: 中文", "info stop", "error: end"],
+        "../../build/grep.log",
+        append_new_lines=True,
+    )
+
+    assert find_in_file("../../build/grep.log", "^info stop$")
+    assert not find_in_file("../../build/grep.log", "^stop")
+    assert list(grep_file("../../build/grep.log", b"^error", remove_new_line=True)) == [
+        (1, "error: 中文"),
+        (3, "error: end"),
+    ]
+
+
+def test_lines_io():
+    logger_section("start test_lines_io")
+
+    os.makedirs("../../build", exist_ok=True)
+    dump_all_text("中文\n", "../../build/io_gbk.txt", encoding="gbk", atomic=True)
+    assert load_all_bytes("../../build/io_gbk.txt") == "中文\n".encode("gbk")
+    assert load_all_text("../../build/io_gbk.txt", encoding="gbk") == "中文\n"
+    assert load_all_text("../../build/io_gbk.txt", encoding="utf-8", errors="replace")
+
+    dump_all_bytes(b"raw\n", "../../build/io_raw.txt", atomic=True)
+    assert load_all_text("../../build/io_raw.txt") == "raw\n"
+
+    dump_lines(
+        (f"line {i}" for i in range(10000)),
+        "../../build/io_lines.txt",
+        append_new_lines=True,
+        encoding="utf-8",
+        atomic=True,
+        batch_size=1000,
+    )
+    lines = load_lines("../../build/io_lines.txt", remove_new_line=True, encoding="utf-8")
+    assert len(lines) == 10000
+    assert lines[-1] == "line 9999"
+
+    # a new file written atomically gets the umask default mode, the umask is left alone
+    umask = os.umask(0o027)
+    try:
+        remove("../../build/io_mode.txt")
+        dump_all_text("mode\n", "../../build/io_mode.txt", atomic=True)
+        assert os.stat("../../build/io_mode.txt").st_mode & 0o777 == 0o640
+        assert os.umask(0o027) == 0o027
+    finally:
+        os.umask(umask)
+
+
+def test_lines_follow():
+    logger_section("start test_lines_follow")
+
+    os.makedirs("../../build", exist_ok=True)
+    log_file = "../../build/follow.log"
+    dump_lines(["a", "b", "c"], log_file, append_new_lines=True)
+
+    def append(content, mode="a"):
+        with open(log_file, mode) as f:
+            f.write(content)
+
+    batches = follow(log_file, lines=2, remove_new_line=True, idle_timeout=2)
+    assert next(batches) == ["b", "c"]
+
+    append("d\ne")
+    assert next(batches) == ["d"]
+    append("\n")
+    assert next(batches) == ["e"]
+
+    # rotate
+    os.replace(log_file, log_file + ".1")
+    append("f\nggg\n")
+    assert next(batches) == ["f", "ggg"]
+
+    # truncate
+    append("x\n", mode="w")
+    assert next(batches) == ["x"]
+    batches.close()
+
+    # rotate by renaming a written file over the path, a single event consumed with the rotation
+    dump_all_text("y\nz\n", log_file + ".new")
+    batches = follow(log_file, remove_new_line=True, idle_timeout=3)
+    rotate = threading.Timer(0.3, os.replace, [log_file + ".new", log_file])
+    rotate.start()
+    start = time.monotonic()
+    assert next(batches) == ["y", "z"]
+    assert time.monotonic() - start < 2
+    rotate.join()
+    batches.close()
+
+    async def run():
+        results = []
+        async for batch in afollow(log_file, lines=1, idle_timeout=0.2):
+            results.append(batch)
+        return results
+
+    assert asyncio.run(run()) == [["z\n"]]
+
+
+def test_lines_diff():
+    logger_section("start test_lines_diff")
+
+    a = ["a\n", "b\n", "c\n", "d\n"]
+    b = ["a\n", "c\n", "d\n", "e\n"]
+    assert diff(a, a) == []
+    assert diff(a, b, n=1) == [
+        "--- a\n",
+        "+++ b\n",
+        "@@ -1,4 +1,4 @@\n",
+        " a\n",
+        "-b\n",
+        " c\n",
+        " d\n",
+        "+e\n",
+    ]
+
+    hunks = diff_hunks(a, b, n=0)
+    assert [(h["a_start"], h["a_count"], h["b_start"], h["b_count"]) for h in hunks] == [
+        (1, 1, 1, 0),
+        (4, 0, 3, 1),
+    ]
+    assert hunks[1]["lines"] == [("+", "e\n")]
+
+    # no unique lines and more than max_d edits: still a small diff
+    a = ["v%d\n" % (i % 5) for i in range(2000)]
+    b = list(a)
+    for p in range(1990, 0, -20):
+        b[p] = "x\n"
+    out = diff(a, b, max_d=20)
+    assert sum(1 for l in out if l[:1] in "+-") == 2 + 2 * 100
+    merged = []
+    for tag, i1, i2, j1, j2 in diff_opcodes(a, b, max_d=20):
+        merged.extend(a[i1:i2] if tag == "equal" else b[j1:j2])
+    assert merged == b
+
+
+def test_lines_scan():
+    logger_section("start test_lines_scan")
+
+    lines = load_lines("./test_block_sample.py")
+
+    is_def = lambda l: l.strip().startswith("def ")
+    is_pass = lambda l: l.strip() == "pass"
+    results = scan(
+        lines,
+        {
+            "body": {"type": "extract", "start": is_def, "finish": is_pass},
+            "empty": {"type": "pair", "first": is_def, "second": is_pass},
+            "direct": {"type": "continue", "first": is_def, "second": is_pass},
+        },
+    )
+
+    assert [lines[b].strip() for b, _ in results["body"]][:2] == [
+        "def test():",
+        "def __init__(self) -> None:",
+    ]
+    assert results["body"][0] == (5, 7)
+    assert (6, 7) in results["empty"]
+    assert (5, 7) not in results["empty"]
+    assert results["direct"][0] == (11, 12)
+
+
+def _upper_chunk(data):
+    return data.upper()
+
+
+def test_lines_chunks():
+    logger_section("start test_lines_chunks")
+
+    os.makedirs("../../build", exist_ok=True)
+    dump_lines((f"line {i}" for i in range(1000)), "../../build/chunks.txt", append_new_lines=True)
+    content = load_all_bytes("../../build/chunks.txt")
+
+    ranges = chunk_ranges("../../build/chunks.txt", 7)
+    assert len(ranges) == 7
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(content)
+    for start, end in ranges:
+        assert content[end - 1 : end] == b"\n"
+
+    assert count_lines("../../build/chunks.txt", workers=3, chunk_size=1024) == 1000
+    upper = map_chunks("../../build/chunks.txt", _upper_chunk, workers=3, chunk_size=1024)
+    assert b"".join(upper) == content.upper()
+
+    dump_all_text("a\nb", "../../build/chunks_tail.txt")
+    assert count_lines("../../build/chunks_tail.txt") == 2
+
+
+def test_shell_graph():
+    logger_section("start test_shell_graph")
+
+    report = run_cmds_graph(
+        {
+            "a": "sleep 0.3",
+            "b": "sleep 0.3",
+            "c": {"cmd": "cat test.txt", "depends_on": ["a", "b"], "cwd": "./data_1"},
+            "bad": "exit 3",
+            "after_bad": {"cmd": "echo never", "depends_on": ["bad"]},
+            "after_after_bad": {"cmd": "echo never", "depends_on": ["after_bad", "a"]},
+        },
+        tip="test",
+        check=True,
+        jobs=3,
+    )
+    assert list(report) == ["a", "b", "c", "bad", "after_bad", "after_after_bad"]
+    assert report["c"]["status"] == "ok"
+    assert report["c"]["start"] >= max(report["a"]["end"], report["b"]["end"])
+    assert report["b"]["start"] < report["a"]["end"]
+    assert report["bad"]["ret"] == 3
+    assert report["after_bad"]["status"] == "skipped"
+    assert report["after_after_bad"]["status"] == "skipped"
+
+    # a repeated dependency runs its dependent once
+    remove("../../build/graph_count.txt")
+    report = run_cmds_graph(
+        {"a": "true", "b": {"cmd": "echo b >> ../../build/graph_count.txt", "depends_on": ["a", "a"]}}
+    )
+    assert report["b"]["status"] == "ok"
+    assert load_all_text("../../build/graph_count.txt") == "b\n"
+
+
+def _cmdline(pid):
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return f.read()
+    except OSError:
+        return b""
+
+
+def test_shell_async():
+    logger_section("start test_shell_async")
+
+    outputs = []
+
+    async def run():
+        rets = await arun_cmds(
+            ["cat test.txt", "printf 'a\\nb'", "echo err 1>&2"],
+            cwd="./data_1",
+            tip="test",
+            check=True,
+            on_output=lambda cmd, stream, line: outputs.append((stream, line)),
+        )
+        assert rets == [0, 0, 0]
+
+        # the whole process group is killed on timeout
+        rets = await arun_cmds(["sh -c 'sleep 5'; echo done"], timeout=0.2)
+        assert rets == [-9]
+
+        rets = await arun_cmds([f"exit {i % 2}" for i in range(50)], jobs=50)
+        assert rets == [i % 2 for i in range(50)]
+
+        # cancelling the caller kills the running commands too
+        task = asyncio.ensure_future(arun_cmds(["sh -c 'sleep 31.7'"]))
+        await asyncio.sleep(0.3)
+        task.cancel()
+        try:
+            await task
+            assert False
+        except asyncio.CancelledError:
+            pass
+        assert not [pid for pid in os.listdir("/proc") if _cmdline(pid) == b"sleep\x0031.7\x00"]
+
+    asyncio.run(run())
+    assert outputs == [("stdout", "a"), ("stdout", "b"), ("stderr", "err")]
+
+
+def test_shell_capture():
+    logger_section("start test_shell_capture")
+
+    # both pipes are filled well past the pipe buffer size
+    cmd = "seq 1 100000; seq 1 100000 1>&2"
+
+    result = run_cmd_capture(cmd, capture="ring", max_bytes=16, check=True)
+    assert result["stdout"] == b"99998\n99999\n100000\n"[-16:]
+    assert result["stderr"] == result["stdout"]
+    assert result["stdout_size"] == result["stderr_size"] == 588895
+
+    result = run_cmd_capture(cmd, capture="spill", max_bytes=1024)
+    assert len(result["stdout"].read()) == 588895
+    result["stdout"].close()
+    result["stderr"].close()
+
+    lines = []
+    result = run_cmd_capture(
+        "printf 'a\\nb'", capture=None, on_line=lambda stream, line: lines.append(line)
+    )
+    assert result["stdout"] is None
+    assert lines == ["a", "b"]
+
+
+def test_shell_cache():
+    logger_section("start test_shell_cache")
+
+    work_dir = "../../build/cache_work"
+    remove(work_dir)
+    os.makedirs(work_dir)
+    dump_all_text("v1\n", f"{work_dir}/in.txt")
+
+    cache = CmdCache("../../build/cache", max_bytes=1 << 20)
+    cmd = "cat in.txt >> log.txt; cp in.txt out.txt; echo built"
+
+    def build():
+        return run_cmd_cached(
+            cmd, cache, inputs=["*.txt"], outputs=["out.txt"], cwd=work_dir, check=True
+        )
+
+    assert build()["cached"] == False
+    remove(f"{work_dir}/out.txt")
+    remove(f"{work_dir}/log.txt")
+
+    # same inputs, output restored without running
+    assert build()["cached"] == True
+    assert load_all_text(f"{work_dir}/out.txt") == "v1\n"
+    assert not os.path.exists(f"{work_dir}/log.txt")
+
+    # changed input, run again
+    dump_all_text("v2\n", f"{work_dir}/in.txt")
+    assert build()["cached"] == False
+    assert load_all_text(f"{work_dir}/out.txt") == "v2\n"
+
+    # output spilled to disk is stored and replayed in blocks, chars cut by a block boundary too
+    cache.max_bytes = 8 << 20
+    big_cmd = "python3 -c \"print('x' + 'é' * 1500000)\""
+    assert run_cmd_cached(big_cmd, cache, cwd=work_dir)["cached"] == False
+    stdout = sys.stdout
+    sys.stdout = io.StringIO()
+    try:
+        assert run_cmd_cached(big_cmd, cache, cwd=work_dir)["cached"] == True
+        assert sys.stdout.getvalue() == "x" + "é" * 1500000 + "\n"
+    finally:
+        sys.stdout = stdout
+
+    # least recently used entries are evicted
+    cache.max_bytes = 0
+    cache.evict()
+    assert build()["cached"] == False
+
+
+def test_shell_session():
+    logger_section("start test_shell_session")
+
+    with ShellSession(cwd=current_dir(__file__), tip="test") as session:
+        assert session.run_cmds(["cd data_1", "export PYEFF_X=1"], check=True) == [0, 0]
+        assert session.run("ls sub_1")[1].split() == ["test.md", "test.txt"]
+        assert session.run("printf $PYEFF_X") == (0, "1")
+        assert session.run("echo out; echo err 1>&2; false") == (1, "out\nerr\n")
+
+        # the session survives the shell exiting, in the same directory
+        assert session.run("exit 3")[0] == 3
+        assert session.run("ls sub_2")[1].split() == ["test.md", "test.txt"]
+
+        # commands bash can not parse fail instead of eating the sentinel
+        assert session.run("echo 'oops")[0] == 2
+        assert session.run("}")[0] == 2
+        assert session.run("printf ok") == (0, "ok")
+
+        # a timeout kills the command and restarts the shell
+        ret, output = session.run("echo start; sleep 30", timeout=0.5)
+        assert (ret, output) == (-9, "start\n")
+        assert session.run("ls sub_2")[1].split() == ["test.md", "test.txt"]
+
+
+def test_shell_profile():
+    logger_section("start test_shell_profile")
+
+    results = profile_cmds(
+        [
+            "python -c 'sum(range(3000000))'",
+            "python -c 'b = bytearray(64 << 20)'",
+            "exit 1",
+        ],
+        tip="test",
+    )
+    assert [r["ret"] for r in results] == [0, 0, 1]
+    assert results[0]["usage"]["user"] > 0
+    assert results[1]["usage"]["maxrss"] > 64 << 10
+    assert results[1]["usage"]["wall"] > 0
+
+    report = run_cmds_graph({"a": "true", "b": {"cmd": "true", "depends_on": ["a"]}})
+    assert report["b"]["usage"]["maxrss"] > 0
+    log_usage_table(report.values())
+
+
+def test_shell_tar():
+    import io
+    import gzip
+    import tarfile
+
+    logger_section("start test_shell_tar")
+
+    data = os.urandom(100000) + b"pyeff\n" * 100000
+    buf = io.BytesIO()
+    with ParallelGzipWriter(buf, threads=3, block_size=40000) as gz:
+        gz.write(data[:12345])
+        gz.write(data[12345:])
+    assert gzip.decompress(buf.getvalue()) == data
+
+    remove("../../build/tar")
+    os.makedirs("../../build/tar/src/sub")
+    dump_all_bytes(data, "../../build/tar/src/a.bin")
+    dump_all_text("hello\n", "../../build/tar/src/sub/b.txt")
+    stats = compress_to_tar_gz(
+        "../../build/tar/src",
+        ["a.bin", "sub/b.txt"],
+        "../../build/tar/out.tar.gz",
+        threads=2,
+        block_size=64 * 1024,
+    )
+    assert stats["files"] == 2
+    assert stats["output_bytes"] < stats["input_bytes"]
+
+    with tarfile.open("../../build/tar/out.tar.gz", "r:gz") as tar:
+        assert tar.getnames() == ["a.bin", "sub/b.txt"]
+        assert tar.extractfile("a.bin").read() == data
+        assert tar.extractfile("sub/b.txt").read() == b"hello\n"
+
+    try:
+        compress_to_tar_gz("../../build/tar/src", ["a.bin"], "../../build/tar/out.tar.gz")
+        assert False
+    except ValueError:
+        pass
+
+
+def test_shell_untar():
+    import tarfile
+
+    logger_section("start test_shell_untar")
+
+    remove("../../build/untar")
+    long_name = "d" * 60 + "/" + "f" * 80 + ".txt"
+    os.makedirs(os.path.dirname("../../build/untar/src/" + long_name))
+    dump_all_text("a\n", "../../build/untar/src/a.txt")
+    dump_all_text("b\n", "../../build/untar/src/b.log")
+    dump_all_text("long\n", "../../build/untar/src/" + long_name)
+    names = ["a.txt", "b.log", long_name]
+
+    with tarfile.open("../../build/untar/plain.tar", "w") as tar:
+        for name in names:
+            tar.add("../../build/untar/src/" + name, arcname=name)
+    compress_to_tar_gz("../../build/untar/src", names, "../../build/untar/packed.tar.gz")
+
+    for archive in ["plain.tar", "packed.tar.gz"]:
+        output = "../../build/untar/out_" + archive.split(".")[0]
+        os.makedirs(output)
+        extracted = extract_from_tar(
+            "../../build/untar/" + archive, output, ["*.txt"]
+        )
+        assert extracted == ["a.txt", long_name]
+        assert load_all_text(output + "/" + long_name) == "long\n"
+        assert not os.path.exists(output + "/b.log")
+
+    members = index_tar("../../build/untar/plain.tar")
+    assert [name for name, _ in members] == names
+    assert os.path.isfile("../../build/untar/plain.tar.idx.json")
+    assert extract_from_tar(
+        "../../build/untar/plain.tar", "../../build/untar/out_plain", ["b.*"]
+    ) == ["b.log"]
+
+    try:
+        index_tar("../../build/untar/packed.tar.gz")
+        assert False
+    except ValueError:
+        pass
+
+    # an unwritable sidecar, e.g. next to a read-only archive, only loses the cache
+    os.makedirs("../../build/untar/out_ro")
+    assert extract_from_tar(
+        "../../build/untar/plain.tar",
+        "../../build/untar/out_ro",
+        ["a.*"],
+        index_file="../../build/untar/missing_dir/plain.tar.idx.json",
+    ) == ["a.txt"]
+    assert not os.path.exists("../../build/untar/missing_dir")
+
+
+def test_shell_argv():
+    logger_section("start test_shell_argv")
+
+    remove("../../build/argv")
+    os.makedirs("../../build/argv")
+
+    # arguments are passed verbatim, no shell expansion or quoting
+    rets = run_cmds(
+        [
+            ["python", "-c", "import sys; open(sys.argv[1], 'w').write('ok')", "$HOME *.txt"],
+            ["python", "-c", "import sys; sys.exit(3)"],
+            ["pyeff-no-such-program"],
+        ],
+        cwd="../../build/argv",
+    )
+    assert rets == [0, 3 << 8, 127 << 8]
+    assert load_all_text("../../build/argv/$HOME *.txt") == "ok"
+
+    assert run_cmds([["true"]]) == [0]
+    run_cmds([["echo", "a b"], "echo c"], join=True, check=True)
+
+    results = profile_cmds([["true"]], log_table=False)
+    assert results[0]["ret"] == 0
+    report = run_cmds_graph({"a": ["true"], "b": {"cmd": ["false"], "depends_on": ["a"]}})
+    assert report["b"]["ret"] == 1
+
+    # a missing program fails its node instead of aborting the graph
+    report = run_cmds_graph({"a": ["pyeff-no-such-program"], "b": "true"})
+    assert (report["a"]["ret"], report["a"]["status"]) == (127, "failed")
+    assert report["b"]["status"] == "ok"
+    assert profile_cmds([["pyeff-no-such-program"]], log_table=False)[0]["ret"] == 127
+
+
 if __name__ == "__main__":
     test_clear()
     test_copy_remove()
     test_move()
     test_yaml()
+    test_yaml_cached()
+    test_yaml_many()
+    test_yaml_stream()
+    test_yaml_patch()
+    test_yaml_watch()
     test_json()
+    test_json_array()
+    test_jsonl()
+    test_json_backend()
     test_logger()
     test_shell()
+    test_lines_edit()
+    test_lines_grep()
+    test_lines_io()
+    test_lines_follow()
+    test_lines_diff()
+    test_lines_scan()
+    test_lines_chunks()
+    test_shell_graph()
+    test_shell_async()
+    test_shell_capture()
+    test_shell_cache()
+    test_shell_session()
+    test_shell_profile()
+    test_shell_tar()
+    test_shell_untar()
+    test_shell_argv()